@@ -1,10 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
+from cpmu.recursos import warm
 
 st.set_page_config(page_title="CPMU", page_icon="📈", layout='wide')
 st.title("Testes do CPMU")
 
+# Já começa a carregar os dados das outras páginas
+warm()
+
 st.markdown("# Sobre")
 st.markdown('''
             ### Aba 1: Dados Sobre Acidentes
@@ -12,12 +14,15 @@ st.markdown('''
             Dados de acidentes em Santos de 2015 a 2024. A partir de 2018 a quantidade de dados 
             anuais cai drasticamente, por isso o ano inicial padrão é 2018. 
 
-            Muitos acidentes aconteceram no mesmo endereço/cruzamento, por isso os pontos ficam 
-            sobrepostos no mapa. Recomendo usar (clicar) a legenda do próprio gráfico para ocultar 
-            alguns pontos e ver quais estão acima de quais, ou usar o seletor do mapa.
+            Muitos acidentes aconteceram no mesmo endereço/cruzamento. Por padrão o mapa de pontos 
+            junta os acidentes do mesmo local num só marcador, maior quanto mais acidentes, com a cor 
+            da gravidade mais frequente; o hover mostra a quantidade de cada gravidade. Também dá para 
+            agrupar numa grade de 50 m ou 200 m (aí o hover mostra só as contagens, sem endereço), 
+            ou voltar a um ponto por acidente.
 
-            A ordem das ruas no cruzamento importa. Rua A x B vai mostrar resultados diferentes de 
-            rua B x A.
+            A ordem das ruas no cruzamento não importa: Rua A x B e rua B x A são o mesmo cruzamento, 
+            tanto no filtro quanto no gráfico de cruzamentos. Com um cruzamento escolhido, o filtro 
+            de logradouro serve só para encontrar os cruzamentos daquelas ruas.
 
             A legenda do mapa oculta os pontos apenas visualmente, ou seja, eles ainda aparecerão
             na tabela de dados. Para evitar isso, selecione a gravidade desejada no filtro de gravidade. 
@@ -0,0 +1,89 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cpmu.tempo import dia_semana
+
+CSV_PATH = 'data/acidentes.csv'
+PARQUET_PATH = 'data/acidentes.parquet'
+
+# Antes de 2018 há bem menos registros por ano; é o início padrão do período
+INICIO_PADRAO = datetime.date(2018, 1, 1)
+
+# Colunas de texto com poucos valores distintos, guardadas como categóricas
+CATEGORICAS = ['gravidade', 'tipo_acidente', 'tempo', 'logradouro', 'cruzamento']
+
+# Colunas usadas pelas páginas, na ordem em que ficam no arquivo
+COLUNAS = ['data_hora', 'dia_semana', 'lat', 'lon', 'logradouro', 'numero',
+           'cruzamento', 'interseccao', 'gravidade', 'tipo_acidente', 'tempo']
+
+def intersection_codes(logradouro: pd.Series, cruzamento: pd.Series) -> pd.Categorical:
+    # Cruzamento sem ordem: o par (menor, maior) dos códigos das duas ruas no
+    # vocabulário comum, rotulado 'A x B' com as ruas em ordem alfabética.
+    # Linhas sem cruzamento ficam vazias.
+    a = logradouro.cat.codes.to_numpy().astype(np.int64)
+    b = cruzamento.cat.codes.to_numpy().astype(np.int64)
+    ruas = logradouro.cat.categories
+    validos = (a >= 0) & (b >= 0)
+    pares = np.where(validos, np.minimum(a, b) * len(ruas) + np.maximum(a, b), -1)
+    unicos, codigos = np.unique(pares[validos], return_inverse=True)
+    rotulos = ruas[unicos // len(ruas)].astype(str) + ' x ' + ruas[unicos % len(ruas)].astype(str)
+    codes = np.full(len(pares), -1, dtype=np.int64)
+    codes[validos] = codigos.ravel()
+    return pd.Categorical.from_codes(codes, categories=rotulos)
+
+def convert_csv(csv_path: str = CSV_PATH, parquet_path: str = PARQUET_PATH) -> None:
+    # Conversão única do CSV para parquet já tipado e ordenado
+    dados = pd.read_csv(csv_path)
+
+    # Data ou hora faltando vira NaT, e a linha fica de fora (o filtro de
+    # período já as descartava; o índice de datas precisa de todas válidas)
+    texto = dados['data'].astype(str) + ' ' + dados['hora'].astype(str)
+    dados['data'] = pd.to_datetime(texto.where(dados['data'].notna() & dados['hora'].notna()))
+    dados = dados[dados['data'].notna()]
+    dados.drop(columns='hora', inplace=True)
+    dados.rename(columns={'lng':'lon','data':'data_hora'}, inplace=True)
+    dados.sort_values(by='data_hora', kind='stable', inplace=True)
+    dados.reset_index(drop=True, inplace=True)
+
+    dados['dia_semana'] = dia_semana(dados['data_hora'].to_numpy())
+    for coluna in CATEGORICAS:
+        dados[coluna] = dados[coluna].astype('category')
+
+    # Logradouro e cruzamento com o mesmo vocabulário de ruas, para os códigos
+    # de uma rua serem iguais nas duas colunas
+    ruas = dados['logradouro'].cat.categories.union(dados['cruzamento'].cat.categories)
+    dados['logradouro'] = dados['logradouro'].cat.set_categories(ruas)
+    dados['cruzamento'] = dados['cruzamento'].cat.set_categories(ruas)
+    dados['interseccao'] = intersection_codes(dados['logradouro'], dados['cruzamento'])
+
+    extras = [c for c in dados.columns if c not in COLUNAS]
+    dados = dados[COLUNAS + extras]
+    dados.to_parquet(parquet_path, index=False)
+
+def read_acidentes(columns: list[str] = COLUNAS, parquet_path: str = PARQUET_PATH,
+                   csv_path: str = CSV_PATH) -> pd.DataFrame:
+    # Refaz o parquet quando o CSV for mais novo que ele ou quando faltar
+    # alguma coluna (parquet gerado por uma versão anterior)
+    if not os.path.exists(parquet_path) or (
+            os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(parquet_path)) or (
+            os.path.exists(csv_path) and not set(COLUNAS) <= set(pq.read_schema(parquet_path).names)):
+        convert_csv(csv_path, parquet_path)
+
+    return pd.read_parquet(parquet_path, columns=columns, memory_map=True)
+
+def available(parquet_path: str = PARQUET_PATH, csv_path: str = CSV_PATH) -> bool:
+    # O CSV de acidentes não vem no repositório; as páginas de operações
+    # funcionam sem ele
+    return os.path.exists(parquet_path) or os.path.exists(csv_path)
+
+def dataset_version(parquet_path: str = PARQUET_PATH) -> str:
+    # Identificador estável do arquivo atual; muda quando o parquet é refeito
+    stat = os.stat(parquet_path)
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+if __name__ == '__main__':
+    convert_csv()
@@ -0,0 +1,176 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+from cpmu import acidentes, sintetico, tempo
+from cpmu.cubo import AccidentCube
+from cpmu.figuras import cluster_map, locate_ids, point_clusters, scatter_map, scatter_traces, selected_ids
+from cpmu.filtros import FilterIndex, OptionCatalog
+from cpmu.graficos import aggregations, charts
+from cpmu.hexagonos import hex_bins
+
+# Medição das etapas da página de acidentes como funções comuns, fora do
+# Streamlit, sobre dados sintéticos (cpmu/sintetico.py). Cada etapa vira uma
+# linha JSON em RESULTADOS_PATH, para comparar execuções ao longo do tempo:
+#
+#   python -m cpmu.benchmark --linhas 10000 100000 --repeticoes 5
+
+TAMANHOS = [10_000, 100_000, 1_000_000, 10_000_000]
+RESULTADOS_PATH = 'benchmarks/resultados.jsonl'
+DADOS_PATH = 'benchmarks/dados'
+
+# Seleções feitas na cadeia de filtros: quantas opções (as mais frequentes)
+# escolher em cada multiselect, na ordem da página
+ESCOLHAS = {'gravidade': 2, 'tipo_acidente': 0, 'tempo': 0, 'logradouro': 3, 'numero': 0, 'interseccao': 1}
+
+def filter_chain(catalogo, inicio, fim, escolhas=ESCOLHAS):
+    # Mesma cascata do bloco de Filtros: cada coluna recebe as opções com os
+    # filtros anteriores e escolhe as mais frequentes
+    filters = [((inicio, fim), 'data_hora')]
+    logradouros = []
+    for column, quantas in escolhas.items():
+        if column == 'interseccao':
+            filtros_cruz = [f for f in filters if f[1] != 'logradouro']
+            opcoes = catalogo.intersections(filtros_cruz, logradouros)
+            escolhidas = opcoes[:quantas]
+            if escolhidas:
+                filters = filtros_cruz
+        else:
+            counts = catalogo.counts(column, filters)
+            escolhidas = counts.sort_values(ascending=False, kind='stable').index[:quantas].tolist()
+            if column == 'logradouro':
+                logradouros = escolhidas
+        filters.append((escolhidas, column))
+    return filters
+
+def selection(df, pontos=5000):
+    # Seleção de laço/caixa como o plotly devolve, com o id da linha no customdata
+    ids = df.index.to_numpy()[:pontos]
+    return {'points': [{'customdata': [int(i), '', '', '']} for i in ids]}
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, tempos
+
+def _render(df, index, cubo, filters, repeticoes):
+    # Da aplicação dos filtros em diante: tudo o que um rerun refaz
+    etapas = {}
+    rows, etapas['selecionar_linhas'] = _medir(lambda: index.select(filters), repeticoes)
+    filtrado, etapas['aplicar_filtros'] = _medir(lambda: index.take(df, filters), repeticoes)
+
+    _, etapas['tracos'] = _medir(lambda: scatter_traces(filtrado), repeticoes)
+    fig, etapas['figura_pontos'] = _medir(lambda: scatter_map(filtrado), repeticoes)
+    _, etapas['figura_json'] = _medir(fig.to_json, repeticoes)
+    (grupos, _), etapas['agrupar_pontos'] = _medir(lambda: point_clusters(filtrado), repeticoes)
+    fig, etapas['figura_agrupada'] = _medir(lambda: cluster_map(grupos), repeticoes)
+    _, etapas['figura_agrupada_json'] = _medir(fig.to_json, repeticoes)
+
+    pontos = selection(filtrado)
+    _, etapas['selecao'] = _medir(
+        lambda: filtrado.take(locate_ids(filtrado.index.to_numpy(), selected_ids(pontos))), repeticoes)
+
+    _, etapas['hexagonos'] = _medir(lambda: hex_bins(filtrado, radius=70), repeticoes)
+
+    _, etapas['grafico_logradouros'] = _medir(lambda: cubo.counts('logradouro', filters).head(10), repeticoes)
+    _, etapas['grafico_gravidade'] = _medir(lambda: cubo.counts('gravidade', filters), repeticoes)
+    _, etapas['grafico_cruzamentos'] = _medir(lambda: cubo.crossings(filters).head(10), repeticoes)
+    _, etapas['grafico_tempo'] = _medir(lambda: cubo.counts('tempo', filters), repeticoes)
+    (slots, contagem), etapas['grafico_slots'] = _medir(lambda: cubo.slots(filters), repeticoes)
+    _, etapas['grafico_horarios'] = _medir(lambda: tempo.half_hour_counts(slots, contagem), repeticoes)
+    _, etapas['grafico_meses'] = _medir(lambda: tempo.monthly_counts(slots, contagem), repeticoes)
+    _, etapas['grafico_semanas'] = _medir(lambda: tempo.weekly_counts(slots, contagem), repeticoes)
+    tabelas, etapas['graficos_agregacoes'] = _medir(lambda: aggregations(cubo, filters), repeticoes)
+    _, etapas['graficos_figuras'] = _medir(lambda: charts(tabelas), repeticoes)
+    return etapas, len(filtrado)
+
+def run(linhas, repeticoes=3, dados_path=DADOS_PATH, seed=0):
+    # Tempos (em segundos) de cada etapa para `linhas` acidentes sintéticos,
+    # em três cenários: 'carga' (uma vez por processo), 'padrao' (só o período
+    # inicial da página, o maior volume desenhado) e 'cascata' (a cadeia de
+    # filtros com seleções). Devolve {cenario: (etapas, linhas filtradas)}.
+    os.makedirs(dados_path, exist_ok=True)
+    csv_path = os.path.join(dados_path, f'acidentes_{linhas}_{seed}.csv')
+    parquet_path = os.path.join(dados_path, f'acidentes_{linhas}_{seed}.parquet')
+    carga = {}
+
+    if not os.path.exists(csv_path):
+        _, carga['gerar'] = _medir(lambda: sintetico.write_csv(csv_path, linhas, seed), 1)
+
+    _, carga['ingestao'] = _medir(lambda: acidentes.convert_csv(csv_path, parquet_path), 1)
+    df, carga['load_data'] = _medir(
+        lambda: acidentes.read_acidentes(parquet_path=parquet_path, csv_path=csv_path), repeticoes)
+
+    # Sem cache: cada repetição mede o cálculo, não a leitura do LRU
+    index, carga['indice'] = _medir(lambda: FilterIndex(df, version='benchmark'), 1)
+    catalogo, carga['catalogo'] = _medir(lambda: OptionCatalog(index), 1)
+    cubo, carga['cubo'] = _medir(lambda: AccidentCube(df, index), 1)
+
+    inicio = pd.Timestamp(acidentes.INICIO_PADRAO)
+    fim = index.datas.bounds()[1].normalize()
+    padrao = [((inicio, fim), 'data_hora')]
+    cascata, tempos_cascata = _medir(lambda: filter_chain(catalogo, inicio, fim), repeticoes)
+
+    resultado = {'carga': (carga, len(df))}
+    for cenario, filters in (('padrao', padrao), ('cascata', cascata)):
+        etapas, filtradas = _render(df, index, cubo, filters, repeticoes)
+        if cenario == 'cascata':
+            etapas = dict(filtros=tempos_cascata, **etapas)
+        resultado[cenario] = (etapas, filtradas)
+    return resultado
+
+def _commit():
+    # Commit do código medido (o do pacote, não o do diretório atual)
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def records(resultado, linhas, execucao, commit):
+    # Uma linha por cenário e etapa, com o ambiente da medição
+    ambiente = {
+        'execucao': execucao,
+        'commit': commit,
+        'maquina': platform.node(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+    return [dict(ambiente, linhas=linhas, cenario=cenario, linhas_filtradas=filtradas, etapa=etapa,
+                 repeticoes=len(tempos), min=min(tempos), mediana=statistics.median(tempos))
+            for cenario, (etapas, filtradas) in resultado.items()
+            for etapa, tempos in etapas.items()]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede as etapas da página de acidentes')
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', default=RESULTADOS_PATH)
+    parser.add_argument('--dados', default=DADOS_PATH, help='onde guardar (e reaproveitar) os CSVs gerados')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    execucao = datetime.datetime.now().isoformat(timespec='seconds')
+    commit = _commit()
+    os.makedirs(os.path.dirname(args.saida) or '.', exist_ok=True)
+    for linhas in args.linhas:
+        registros = records(run(linhas, args.repeticoes, args.dados, args.seed), linhas, execucao, commit)
+        with open(args.saida, 'a') as arquivo:
+            for registro in registros:
+                arquivo.write(json.dumps(registro) + '\n')
+        for registro in registros:
+            print(f"{linhas:>10} {registro['cenario']:<8} {registro['etapa']:<22} {registro['min'] * 1000:10.1f} ms")
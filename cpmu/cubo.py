@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from cpmu import tempo
+from cpmu.cache import LRUCache
+from cpmu.filtros import COLUNAS_FILTRO, FilterIndex, Filters, normalize_filters
+
+# Colunas das células. Número e cruzamento ficam de fora: com um deles no
+# filtro, a seleção é pequena e as células saem das próprias linhas.
+COLUNAS_CUBO = [c for c in COLUNAS_FILTRO if c not in ('numero', 'cruzamento')]
+
+class AccidentCube:
+    # Cubo pré-agregado para a aba de Gráficos, montado uma vez no carregamento.
+    # Cada célula é uma combinação de meia hora, gravidade, tempo, tipo de
+    # acidente e local (logradouro, interseção) com a sua contagem; o dia da
+    # semana sai da meia hora. Os gráficos somam as células que passam nos
+    # filtros, sem voltar às linhas. As células ficam ordenadas pela meia
+    # hora, e o período vira uma fatia delas por busca binária.
+    #
+    # Limitação: a meia hora é do calendário (o período e os gráficos de
+    # horário, mês e semana precisam dela junto com o local), então o número
+    # de células cresce com as combinações distintas de meia hora e local. Nos
+    # dados reais muitos acidentes se repetem; nos sintéticos, com horários
+    # aleatórios, há quase uma célula por linha e o custo dos gráficos continua
+    # proporcional às linhas filtradas, só sem o groupby do pandas a cada rerun.
+
+    def __init__(self, df: pd.DataFrame, index: FilterIndex, cache: LRUCache | None = None):
+        self.index = index
+        self.version = index.version
+        self.cache = cache
+
+        grupos = pd.DataFrame({c: index.codes(c) for c in COLUNAS_CUBO})
+        grupos['slot'] = df['data_hora'].dt.floor('30min').to_numpy()
+        # Marca os acidentes exatamente no início da meia hora, para o fim do
+        # período (que é meia-noite) cortar igual ao filtro das linhas
+        grupos['no_inicio'] = df['data_hora'].to_numpy() == grupos['slot'].to_numpy()
+        self._slots_linhas = grupos['slot'].to_numpy()
+        cells = grupos.groupby(list(grupos.columns), sort=False).size().reset_index(name='contagem')
+
+        # Chave de ordem: a meia hora, com as células do início exato antes
+        # das outras da mesma meia hora
+        chave = tempo.as_int64(cells['slot'].to_numpy()) * 2 + ~cells['no_inicio'].to_numpy()
+        ordem = np.argsort(chave, kind='stable')
+        self.cells = cells.take(ordem).reset_index(drop=True)
+        self._chave = chave[ordem]
+
+    def window(self, filters: Filters) -> slice:
+        # Fatia das células do período: da meia hora do início até a do fim,
+        # só com os acidentes exatamente no início dela
+        for column, valores in normalize_filters(filters):
+            if column == 'data_hora':
+                start, finish = (pd.Timestamp(v).value * 2 for v in valores)
+                return slice(int(np.searchsorted(self._chave, start, side='left')),
+                             int(np.searchsorted(self._chave, finish, side='right')))
+        return slice(0, len(self.cells))
+
+    def mask(self, filters: Filters, janela: slice | None = None) -> np.ndarray | None:
+        # Mesmos filtros de valores do FilterIndex, aplicados às células da janela
+        janela = slice(0, len(self.cells)) if janela is None else janela
+        bits = None
+        for column, valores in normalize_filters(filters):
+            if column == 'data_hora':
+                continue
+            atual = np.isin(self.cells[column].to_numpy()[janela], self.index.lookup(column, valores))
+            bits = atual if bits is None else bits & atual
+        return bits
+
+    def _row_cells(self, filters):
+        # Uma célula por linha que passa nos filtros, com as mesmas colunas
+        rows = self.index.select(filters)
+        rows = slice(None) if rows is None else rows
+        cells = pd.DataFrame({c: self.index.codes(c)[rows] for c in COLUNAS_CUBO})
+        cells['slot'] = self._slots_linhas[rows]
+        cells['contagem'] = 1
+        return cells
+
+    def select(self, filters: Filters) -> pd.DataFrame:
+        # Células que passam nos filtros, guardadas no cache como no FilterIndex
+        spec = normalize_filters(filters)
+        key = ('cubo', self.version, spec)
+        cells = self.cache.get(key) if self.cache is not None else None
+        if cells is None and any(column not in COLUNAS_CUBO + ['data_hora'] for column, _ in spec):
+            cells = self._row_cells(filters)
+            if self.cache is not None:
+                self.cache.put(key, cells)
+        if cells is None:
+            janela = self.window(filters)
+            bits = self.mask(filters, janela)
+            cells = self.cells.iloc[janela]
+            if bits is not None:
+                cells = cells[bits]
+            if self.cache is not None:
+                self.cache.put(key, cells)
+        return cells
+
+    def counts(self, column: str, filters: Filters) -> pd.Series:
+        # Contagem por valor da coluna, só os valores presentes, do maior para o menor
+        cells = self.select(filters)
+        valores = self.index.values(column)
+        counts = np.bincount(cells[column].to_numpy(), weights=cells['contagem'].to_numpy(),
+                             minlength=len(valores)).astype(np.int64)
+        counts = pd.Series(counts, index=valores)
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def crossings(self, filters: Filters) -> pd.Series:
+        # Contagem por interseção (sem ordem das ruas), sem cruzamento vazio
+        cells = self.select(filters)
+        interseccoes = self.index.values('interseccao')
+        counts = np.bincount(cells['interseccao'].to_numpy(), weights=cells['contagem'].to_numpy(),
+                             minlength=len(interseccoes)).astype(np.int64)
+        counts = pd.Series(counts, index=interseccoes)
+        counts = counts[(counts > 0).to_numpy() & interseccoes.notna()]
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def slots(self, filters: Filters) -> tuple[np.ndarray, np.ndarray]:
+        # Início de cada meia hora do calendário e sua contagem, para os
+        # agrupamentos de cpmu.tempo
+        cells = self.select(filters)
+        return cells['slot'].to_numpy(), cells['contagem'].to_numpy()
@@ -0,0 +1,149 @@
+import copy
+
+import numpy as np
+import numpy.typing as npt
+
+from cpmu.hexagonos import METROS_LAT, METROS_LON
+
+# Tamanho padrão da célula da grade, em graus (~500 m em Santos)
+CELULA = 0.005
+
+class GridIndex:
+    # Índice espacial em grade regular sobre caixas envolventes (pontos são
+    # caixas de tamanho zero). Cada célula guarda os ids dos itens que a
+    # tocam, no mesmo esquema de listas ordenadas do FilterIndex.
+
+    def __init__(self, min_lon: npt.ArrayLike, min_lat: npt.ArrayLike, max_lon: npt.ArrayLike | None = None,
+                 max_lat: npt.ArrayLike | None = None, cell: float = CELULA):
+        self.min_lon = np.asarray(min_lon, dtype=float)
+        self.min_lat = np.asarray(min_lat, dtype=float)
+        self.max_lon = self.min_lon if max_lon is None else np.asarray(max_lon, dtype=float)
+        self.max_lat = self.min_lat if max_lat is None else np.asarray(max_lat, dtype=float)
+        self.cell = cell
+        self.n = len(self.min_lon)
+
+        validos = np.flatnonzero(~np.isnan(self.min_lon) & ~np.isnan(self.min_lat))
+        self._validos = validos
+        if len(validos):
+            self.lon0 = self.min_lon[validos].min()
+            self.lat0 = self.min_lat[validos].min()
+        else:
+            self.lon0 = self.lat0 = 0.0
+
+        self._build(*self._postings(validos))
+        self._chaves_novas = np.empty(0, dtype=np.int64)
+        self._ids_novos = np.empty(0, dtype=np.int64)
+
+    def _postings(self, validos):
+        # Células cobertas por cada caixa, expandidas item a item
+        x0, y0 = self._celula(self.min_lon[validos], self.min_lat[validos])
+        x1, y1 = self._celula(self.max_lon[validos], self.max_lat[validos])
+        largura = x1 - x0 + 1
+        quantas = largura * (y1 - y0 + 1)
+        ids = np.repeat(validos, quantas)
+        passo = np.arange(quantas.sum()) - np.repeat(np.cumsum(quantas) - quantas, quantas)
+        xs = np.repeat(x0, quantas) + passo % np.repeat(largura, quantas)
+        ys = np.repeat(y0, quantas) + passo // np.repeat(largura, quantas)
+        return self._chave(xs, ys), ids.astype(np.int64)
+
+    def _build(self, chaves, ids):
+        ordem = np.argsort(chaves, kind='stable')
+        self._chaves, inicio = np.unique(chaves[ordem], return_index=True)
+        self._offsets = np.append(inicio, len(ordem))
+        self._ids = ids[ordem]
+
+    def extend(self, min_lon: npt.ArrayLike, min_lat: npt.ArrayLike, max_lon: npt.ArrayLike | None = None,
+               max_lat: npt.ArrayLike | None = None) -> 'GridIndex':
+        # Novo índice com os itens acrescentados (ids a partir de n), sem
+        # refazer as listas das células: as células dos itens novos ficam numa
+        # parte à parte, consultada junto, e só são fundidas às listas
+        # principais quando passam de um décimo delas. O índice atual não muda
+        # (outras sessões podem estar lendo).
+        novo = copy.copy(self)
+        min_lon = np.asarray(min_lon, dtype=float)
+        min_lat = np.asarray(min_lat, dtype=float)
+        max_lon = min_lon if max_lon is None else np.asarray(max_lon, dtype=float)
+        max_lat = min_lat if max_lat is None else np.asarray(max_lat, dtype=float)
+        novo.min_lon = np.concatenate([self.min_lon, min_lon])
+        novo.min_lat = np.concatenate([self.min_lat, min_lat])
+        novo.max_lon = np.concatenate([self.max_lon, max_lon])
+        novo.max_lat = np.concatenate([self.max_lat, max_lat])
+        novo.n = self.n + len(min_lon)
+
+        validos = self.n + np.flatnonzero(~np.isnan(min_lon) & ~np.isnan(min_lat))
+        novo._validos = np.concatenate([self._validos, validos])
+        chaves, ids = novo._postings(validos)
+        novo._chaves_novas = np.concatenate([self._chaves_novas, chaves])
+        novo._ids_novos = np.concatenate([self._ids_novos, ids])
+
+        if len(novo._ids_novos) > max(len(self._ids) // 10, 64):
+            antigas = np.repeat(self._chaves, np.diff(self._offsets))
+            novo._build(np.concatenate([antigas, novo._chaves_novas]),
+                        np.concatenate([self._ids, novo._ids_novos]))
+            novo._chaves_novas = np.empty(0, dtype=np.int64)
+            novo._ids_novos = np.empty(0, dtype=np.int64)
+        return novo
+
+    @classmethod
+    def from_points(cls, lon: npt.ArrayLike, lat: npt.ArrayLike, cell: float = CELULA) -> 'GridIndex':
+        return cls(lon, lat, cell=cell)
+
+    def _celula(self, lon, lat):
+        return (np.floor((lon - self.lon0) / self.cell).astype(np.int64),
+                np.floor((lat - self.lat0) / self.cell).astype(np.int64))
+
+    @staticmethod
+    def _chave(x, y):
+        return (x << 32) + y
+
+    def query_bbox(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        # Ids (ordenados) dos itens cuja caixa cruza a caixa pedida
+        x0, y0 = self._celula(np.array([west]), np.array([south]))
+        x1, y1 = self._celula(np.array([east]), np.array([north]))
+        celulas = int((x1[0] - x0[0] + 1) * (y1[0] - y0[0] + 1))
+
+        if celulas <= 0:
+            return np.empty(0, dtype=np.int64)
+        if celulas > len(self._chaves):
+            # Caixa maior que a própria grade: mais barato testar todos
+            candidatos = self._validos
+        else:
+            xs, ys = np.meshgrid(np.arange(x0[0], x1[0] + 1), np.arange(y0[0], y1[0] + 1))
+            chaves = self._chave(xs.ravel(), ys.ravel())
+            pos = np.searchsorted(self._chaves, chaves)
+            existe = pos < len(self._chaves)
+            existe[existe] = self._chaves[pos[existe]] == chaves[existe]
+            partes = [self._ids[self._offsets[p]:self._offsets[p + 1]] for p in pos[existe]]
+            partes.append(self._ids_novos[np.isin(self._chaves_novas, chaves)])
+            candidatos = np.unique(np.concatenate(partes)) if partes else np.empty(0, dtype=np.int64)
+
+        dentro = ((self.max_lon[candidatos] >= west) & (self.min_lon[candidatos] <= east) &
+                  (self.max_lat[candidatos] >= south) & (self.min_lat[candidatos] <= north))
+        return candidatos[dentro]
+
+    def query_radius(self, lon: float, lat: float, meters: float) -> np.ndarray:
+        # Ids dos itens a até `meters` metros do ponto (distância até a caixa)
+        dlon = meters / METROS_LON
+        dlat = meters / METROS_LAT
+        candidatos = self.query_bbox(lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+        dx = np.maximum(np.maximum(self.min_lon[candidatos] - lon, lon - self.max_lon[candidatos]), 0) * METROS_LON
+        dy = np.maximum(np.maximum(self.min_lat[candidatos] - lat, lat - self.max_lat[candidatos]), 0) * METROS_LAT
+        return candidatos[dx * dx + dy * dy <= meters * meters]
+
+def cluster_points(lon: npt.ArrayLike, lat: npt.ArrayLike,
+                   cell: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Agrupa pontos em células de `cell` graus. Devolve, para cada célula, o
+    # centro médio, a quantidade e o índice de um ponto representante, além
+    # da célula de cada ponto.
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    chaves = GridIndex._chave(np.floor(lon / cell).astype(np.int64), np.floor(lat / cell).astype(np.int64))
+    _, primeiro, grupo, quantos = np.unique(chaves, return_index=True, return_inverse=True, return_counts=True)
+    grupo = grupo.ravel()
+    centro_lon = np.bincount(grupo, weights=lon) / quantos
+    centro_lat = np.bincount(grupo, weights=lat) / quantos
+    return centro_lon, centro_lat, quantos, primeiro, grupo
+
+def cell_for_zoom(zoom: float, pixels: int = 60) -> float:
+    # Tamanho de célula (graus) equivalente a `pixels` na tela, no nível de zoom
+    return 360.0 / (256 * 2 ** zoom) * pixels
@@ -0,0 +1,161 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import zipfile
+from collections.abc import Hashable
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cpmu.cubo import AccidentCube
+from cpmu.filtros import Filters
+from cpmu.graficos import aggregations
+
+logger = logging.getLogger(__name__)
+
+# Exportação dos acidentes filtrados (e da seleção do mapa) e das tabelas da
+# aba de Gráficos. Os arquivos são gravados em blocos por um pool de threads,
+# fora do rerun, e ficam em EXPORTACOES_PATH com o nome dado pela chave do
+# conteúdo: o mesmo pedido, de qualquer sessão, reaproveita o arquivo pronto
+# ou a tarefa em andamento.
+
+EXPORTACOES_PATH = 'data/exportacoes'
+
+# Linhas por bloco gravado
+BLOCO = 100_000
+
+# Arquivos guardados; os mais antigos são apagados
+MAX_ARQUIVOS = 50
+
+# Rótulo na página -> extensão do arquivo
+FORMATOS = {'CSV': 'csv', 'Parquet': 'parquet', 'GeoJSON': 'geojson', 'Tabelas dos gráficos (CSV)': 'zip'}
+
+MIMES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet',
+         'geojson': 'application/geo+json', 'zip': 'application/zip'}
+
+def export_key(version: Hashable, spec: Hashable, extensao: str, ids: npt.ArrayLike | None = None) -> str:
+    # Chave do conteúdo: versão dos dados, filtros normalizados, formato e,
+    # com uma seleção no mapa, os ids das linhas
+    chave = hashlib.sha256(repr((version, spec, extensao)).encode())
+    if ids is not None:
+        chave.update(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+    return chave.hexdigest()[:32]
+
+def write_csv(df: pd.DataFrame, path: str, bloco: int = BLOCO) -> None:
+    for inicio in range(0, max(len(df), 1), bloco):
+        df.iloc[inicio:inicio + bloco].to_csv(path, index=False, mode='w' if inicio == 0 else 'a',
+                                              header=inicio == 0)
+
+def write_parquet(df: pd.DataFrame, path: str, bloco: int = BLOCO) -> None:
+    # Um grupo de linhas por bloco, com o esquema (e as categorias) do DataFrame todo
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as arquivo:
+        for inicio in range(0, len(df), bloco):
+            arquivo.write_table(pa.Table.from_pandas(df.iloc[inicio:inicio + bloco], schema=schema,
+                                                     preserve_index=False))
+
+def write_geojson(df: pd.DataFrame, path: str, bloco: int = BLOCO) -> None:
+    # Um ponto por acidente, com as outras colunas nas propriedades; acidentes
+    # sem coordenada ficam sem geometria
+    with open(path, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('{"type": "FeatureCollection", "features": [')
+        separador = ''
+        for inicio in range(0, len(df), bloco):
+            parte = df.iloc[inicio:inicio + bloco]
+            propriedades = json.loads(parte.drop(columns=['lat', 'lon']).to_json(orient='records',
+                                                                                 date_format='iso'))
+            for props, lon, lat in zip(propriedades, parte['lon'].to_numpy(), parte['lat'].to_numpy()):
+                geometria = None if np.isnan(lon) or np.isnan(lat) else {
+                    'type': 'Point', 'coordinates': [float(lon), float(lat)]}
+                arquivo.write(separador + json.dumps({'type': 'Feature', 'geometry': geometria,
+                                                      'properties': props}, ensure_ascii=False))
+                separador = ','
+        arquivo.write(']}')
+
+def write_aggregates(cubo: AccidentCube, filters: Filters, path: str) -> None:
+    # Um CSV por tabela da aba de Gráficos, num zip
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        for nome, tabela in aggregations(cubo, filters).items():
+            arquivo.writestr(f'{nome}.csv', tabela.to_csv(index=False))
+
+ESCRITORES = {'csv': write_csv, 'parquet': write_parquet, 'geojson': write_geojson, 'zip': write_aggregates}
+
+class ExportService:
+    # Pool de threads das exportações, um por processo (ver cpmu/recursos.py)
+
+    def __init__(self, path: str = EXPORTACOES_PATH, max_workers: int = 2, max_arquivos: int = MAX_ARQUIVOS):
+        self.path = path
+        self.max_arquivos = max_arquivos
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                           thread_name_prefix='cpmu-exportacao')
+        self._tarefas = {}
+        self._trava = threading.Lock()
+
+    def file_path(self, chave: str, extensao: str) -> str:
+        return os.path.join(self.path, f'{chave}.{extensao}')
+
+    def submit(self, chave: str, extensao: str, *args) -> None:
+        # Agenda ESCRITORES[extensao](*args, caminho), a não ser que o arquivo
+        # já exista ou já esteja sendo gravado; depois de um erro, tenta de novo
+        caminho = self.file_path(chave, extensao)
+        with self._trava:
+            tarefa = self._tarefas.get(chave)
+            if os.path.exists(caminho) or (tarefa is not None and not tarefa.done()):
+                return
+            self._tarefas[chave] = self._pool.submit(self._run, extensao, args, caminho)
+
+    def _run(self, extensao, args, caminho):
+        os.makedirs(self.path, exist_ok=True)
+        temporario = f'{caminho}.{threading.get_ident()}.tmp'
+        try:
+            ESCRITORES[extensao](*args, temporario)
+            os.replace(temporario, caminho)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        self._prune()
+        return caminho
+
+    def _prune(self):
+        arquivos = [os.path.join(self.path, nome) for nome in os.listdir(self.path)
+                    if not nome.endswith('.tmp')]
+        arquivos.sort(key=os.path.getmtime, reverse=True)
+        for antigo in arquivos[self.max_arquivos:]:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+
+    def read(self, chave: str, extensao: str) -> bytes:
+        # Conteúdo do arquivo pronto, lido no clique do download. Se a limpeza
+        # o apagou depois do status, devolve vazio (o próximo rerun mostra o
+        # pedido como não feito) em vez de falhar na thread do download.
+        try:
+            with open(self.file_path(chave, extensao), 'rb') as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            logger.warning('Exportação %s.%s apagada antes do download', chave, extensao)
+            return b''
+
+    def status(self, chave: str, extensao: str) -> tuple[str | None, object]:
+        # ('pronto', caminho), ('andamento', None), ('erro', exceção) ou
+        # (None, None) quando ainda não foi pedido
+        caminho = self.file_path(chave, extensao)
+        if os.path.exists(caminho):
+            return 'pronto', caminho
+        with self._trava:
+            tarefa = self._tarefas.get(chave)
+        if tarefa is None:
+            return None, None
+        if not tarefa.done():
+            return 'andamento', None
+        if tarefa.exception() is not None:
+            return 'erro', tarefa.exception()
+        # Pronto mas já apagado pela limpeza: pode ser pedido de novo
+        return None, None
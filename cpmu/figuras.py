@@ -0,0 +1,202 @@
+from collections.abc import Mapping
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import plotly.graph_objects as go
+import pydeck as pdk
+
+from cpmu.espacial import cluster_points
+from cpmu.hexagonos import METROS_LAT, PESOS_GRAVIDADE
+
+gravidade_colors = {
+    'C/ VÍTIMAS LEVES': 'green',
+    'C/ VÍTIMAS GRAVES': 'orange',
+    'C/ VÍTIMAS FATAIS': 'red',
+    'S/ LESÃO': 'blue'
+}
+
+HOVER_COLUNAS = ['logradouro', 'numero', 'cruzamento']
+# customdata[0] é sempre o id da linha (índice de df), usado na seleção do mapa
+HOVER_TEMPLATE = ('Logradouro: %{customdata[1]}<br>Número: %{customdata[2]}'
+                  '<br>Cruzamento: %{customdata[3]}<extra></extra>')
+
+# Agrupamento dos pontos do mapa: None desenha um ponto por acidente, 0 junta
+# os acidentes na mesma coordenada e os outros valores, numa grade de tantos metros
+AGRUPAMENTOS = {'Não agrupar': None, 'Mesmo local': 0, '50 m': 50, '200 m': 200}
+
+# customdata[0] é o número do grupo; a divisão por gravidade vem depois do total
+GRAVIDADES_TEMPLATE = ('<br>S/ lesão: %{customdata[5]}<br>Vítimas leves: %{customdata[6]}'
+                       '<br>Vítimas graves: %{customdata[7]}<br>Vítimas fatais: %{customdata[8]}<extra></extra>')
+# O endereço só no agrupamento por local, em que é o mesmo para todos os
+# acidentes do marcador; numa célula da grade seria o de um deles só
+GRUPO_TEMPLATE = ('<b>Acidentes: %{customdata[4]}</b><br>Logradouro: %{customdata[1]}'
+                  '<br>Número: %{customdata[2]}<br>Cruzamento: %{customdata[3]}' + GRAVIDADES_TEMPLATE)
+CELULA_TEMPLATE = '<b>Acidentes: %{customdata[4]}</b>' + GRAVIDADES_TEMPLATE
+
+def hover_text(df: pd.DataFrame) -> pd.Series:
+    # Texto do hover montado em bloco, sem laço por linha
+    return ('Logradouro: ' + df['logradouro'].astype(str)
+            + '<br>Número: ' + df['numero'].astype(str)
+            + '<br>Cruzamento: ' + df['cruzamento'].astype(str))
+
+def scatter_traces(df: pd.DataFrame, hover: str = 'template') -> list[go.Scattermapbox]:
+    # Um trace por gravidade, em uma única passada agrupada.
+    # hover='template' manda só os campos em customdata e deixa o navegador
+    # formatar o texto; hover='texto' manda o texto pronto do servidor.
+    traces = []
+    for gravidade, grupo in df.groupby('gravidade', observed=True, sort=False):
+        marker = dict(
+            size=8,
+            opacity=0.7,
+            color=gravidade_colors.get(gravidade, 'gray')
+        )
+        ids = grupo.index.to_numpy()
+        if hover == 'template':
+            extras = dict(
+                customdata=np.column_stack([ids.astype(object)] + [grupo[c].astype(str).to_numpy(dtype=object)
+                                                                   for c in HOVER_COLUNAS]),
+                hovertemplate=HOVER_TEMPLATE
+            )
+        else:
+            extras = dict(customdata=ids, hovertext=hover_text(grupo).to_numpy(), hoverinfo='text')
+
+        traces.append(go.Scattermapbox(
+            lat=grupo['lat'].to_numpy(),
+            lon=grupo['lon'].to_numpy(),
+            mode='markers',
+            marker=marker,
+            name=f'{gravidade}',
+            **extras
+        ))
+    return traces
+
+def selected_ids(selection: Mapping) -> np.ndarray:
+    # Ids das linhas selecionadas (laço/caixa), lidos do customdata de cada ponto
+    ids = []
+    for point in selection.get('points', []):
+        customdata = point.get('customdata')
+        if customdata is None:
+            continue
+        ids.append(customdata[0] if isinstance(customdata, (list, tuple)) else customdata)
+    return np.unique(np.asarray(ids, dtype=np.int64))
+
+def locate_ids(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    # Posições dos ids em um índice ordenado, por busca binária: O(k log n).
+    # Ids que não estão mais no índice (filtro mudou) são ignorados.
+    positions = np.searchsorted(sorted_ids, ids)
+    valid = positions < len(sorted_ids)
+    valid[valid] = sorted_ids[positions[valid]] == ids[valid]
+    return positions[valid]
+
+def point_clusters(df: pd.DataFrame, metros: float = 0) -> tuple[pd.DataFrame, np.ndarray]:
+    # Um grupo por coordenada (metros=0) ou por célula de `metros` metros, com
+    # o centro, o total, o total de cada gravidade, a gravidade dominante e o
+    # endereço do primeiro acidente. Devolve também o grupo de cada linha,
+    # para a seleção no mapa voltar às linhas.
+    cell = metros / METROS_LAT if metros else 1e-6
+    lon, lat, total, primeiro, grupo = cluster_points(df['lon'].to_numpy(), df['lat'].to_numpy(), cell)
+    grupos = pd.DataFrame({'lat': lat, 'lon': lon, 'total': total})
+
+    gravidades = df['gravidade'].to_numpy()
+    for gravidade, (coluna, _) in PESOS_GRAVIDADE.items():
+        grupos[coluna] = np.bincount(grupo[gravidades == gravidade], minlength=len(total))
+
+    # A mais frequente; no empate, a mais grave (argmax fica com a primeira)
+    colunas = [coluna for coluna, _ in PESOS_GRAVIDADE.values()][::-1]
+    contagens = grupos[colunas].to_numpy()
+    dominante = np.array(list(PESOS_GRAVIDADE)[::-1], dtype=object)[contagens.argmax(axis=1)]
+    grupos['gravidade'] = np.where(contagens.max(axis=1) > 0, dominante,
+                                   df['gravidade'].astype(str).to_numpy(dtype=object)[primeiro])
+    for coluna in HOVER_COLUNAS:
+        grupos[coluna] = df[coluna].astype(str).to_numpy(dtype=object)[primeiro]
+    return grupos, grupo
+
+def cluster_traces(grupos: pd.DataFrame, endereco: bool = True) -> list[go.Scattermapbox]:
+    # Um marcador por grupo, com o tamanho pela quantidade e a cor pela
+    # gravidade dominante; um trace por gravidade, como em scatter_traces.
+    # Sem endereco (grade de metros), o hover mostra só as contagens.
+    colunas = HOVER_COLUNAS + ['total'] + [coluna for coluna, _ in PESOS_GRAVIDADE.values()]
+    traces = []
+    for gravidade, parte in grupos.groupby('gravidade', sort=False):
+        ids = parte.index.to_numpy()
+        traces.append(go.Scattermapbox(
+            lat=parte['lat'].to_numpy(),
+            lon=parte['lon'].to_numpy(),
+            mode='markers',
+            marker=dict(
+                size=np.clip(6 + 3 * np.sqrt(parte['total'].to_numpy()), 8, 40),
+                opacity=0.7,
+                color=gravidade_colors.get(gravidade, 'gray')
+            ),
+            name=f'{gravidade}',
+            customdata=np.column_stack([ids.astype(object)] + [parte[c].to_numpy(dtype=object) for c in colunas]),
+            hovertemplate=GRUPO_TEMPLATE if endereco else CELULA_TEMPLATE
+        ))
+    return traces
+
+def cluster_rows(grupo: np.ndarray, selecionados: npt.ArrayLike) -> np.ndarray:
+    # Posições das linhas dos grupos selecionados no mapa agrupado
+    return np.flatnonzero(np.isin(grupo, selecionados))
+
+def scatter_map(df: pd.DataFrame, hover: str = 'template') -> go.Figure:
+    return _layout(go.Figure(scatter_traces(df, hover=hover)))
+
+def cluster_map(grupos: pd.DataFrame, endereco: bool = True) -> go.Figure:
+    return _layout(go.Figure(cluster_traces(grupos, endereco)))
+
+def _layout(fig):
+    fig.update_layout(
+        mapbox=dict(
+            style="open-street-map",
+            center=dict(lat=-23.959, lon=-46.342),
+            zoom=12
+        ),
+        height=450,
+        margin=dict(l=0, r=0, t=0, b=0),
+        legend=dict(
+            x=0.0,
+            y=0.925,
+            xanchor='left',
+            yanchor='middle',
+            font=dict(size=14),
+            orientation='v'
+        ),
+        showlegend=True
+    )
+    return fig
+
+def heat_deck(cells: pd.DataFrame, raio: float) -> pdk.Deck:
+    # Mapa de calor em colunas hexagonais (células de hexagonos.column_data)
+    return pdk.Deck(
+        map_style='light',
+        initial_view_state=pdk.ViewState(
+            latitude=-23.959,
+            longitude=-46.342,
+            zoom=11,
+            pitch=50
+        ),
+        layers=[
+            pdk.Layer(
+                "ColumnLayer",
+                data=cells,
+                get_position="[lon, lat]",
+                get_elevation="elevacao",
+                get_fill_color="cor",
+                radius=raio,
+                disk_resolution=6,
+                angle=30,
+                elevation_scale=2,
+                auto_highlight=True,
+                pickable=True,
+                extruded=True,
+                material=True
+            )
+        ],
+        tooltip={'html': '<b>Acidentes:</b> {total}<br>'
+                         'S/ lesão: {sem_lesao}<br>'
+                         'Vítimas leves: {leves}<br>'
+                         'Vítimas graves: {graves}<br>'
+                         'Vítimas fatais: {fatais}<br>'
+                         'Ponderado: {ponderado}'}
+    )
@@ -0,0 +1,299 @@
+import unicodedata
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from cpmu import tempo
+from cpmu.cache import LRUCache
+from cpmu.tempo import Data
+
+# Colunas dos multiselects do bloco de Filtros ('interseccao' é o cruzamento
+# sem ordem das ruas, ver cpmu/acidentes.py)
+COLUNAS_FILTRO = ['gravidade', 'tipo_acidente', 'tempo', 'logradouro', 'numero', 'cruzamento', 'interseccao']
+
+# Filtros da página: pares (valor, coluna), o valor uma lista de opções, uma
+# opção só ou, em data_hora, o par (início, fim)
+Filters = Sequence[tuple[Any, str]]
+
+# Saída de normalize_filters: ((coluna, valores), ...) ordenada por coluna
+Spec = tuple[tuple[str, tuple], ...]
+
+def _chave(value):
+    # Chave de ordenação para listas com tipos misturados (NaN, números, textos)
+    return (type(value).__name__, str(value))
+
+def _vazio(value):
+    # NaN (o número em branco dos cruzamentos, por exemplo) vira None: como
+    # nan != nan, duas especificações iguais nunca seriam a mesma chave de cache
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else value
+
+def normalize_filters(filters: Filters) -> Spec:
+    # Especificação dos filtros independente da ordem: tupla ordenada por coluna
+    # com os valores ordenados; filtros vazios são descartados e os valores
+    # vazios são sempre None
+    spec = {}
+    for filter_value, column in filters:
+        if not filter_value:
+            continue
+        if column == 'data_hora':
+            start, finish = filter_value
+            spec[column] = (pd.Timestamp(start).isoformat(), pd.Timestamp(finish).isoformat())
+        elif isinstance(filter_value, list):
+            spec[column] = tuple(sorted({_vazio(v) for v in filter_value}, key=_chave))
+        else:
+            spec[column] = (_vazio(filter_value),)
+    return tuple(sorted(spec.items()))
+
+class DateIndex:
+    # Índice das datas já ordenadas (o parquet sai ordenado por data_hora). Um
+    # período vira uma fatia contígua de linhas: a contagem acumulada por dia
+    # diz onde cada dia começa, e a busca binária fica só entre as linhas do dia.
+
+    def __init__(self, datas: np.ndarray):
+        # Só o trecho sem NaT: a ordenação do pandas põe os NaT no fim, e eles
+        # nunca passam num filtro de período
+        ns = tempo.as_int64(datas)
+        self.n = len(ns) - int(np.count_nonzero(ns == np.iinfo(np.int64).min))
+        self._ns = ns[:self.n]
+        dias = self._ns // tempo.NS_DIA
+        self.dia0 = int(dias[0]) if self.n else 0
+        por_dia = np.bincount(dias - self.dia0) if self.n else np.zeros(0, dtype=np.int64)
+        self._acumulado = np.concatenate(([0], np.cumsum(por_dia)))
+
+    def position(self, data: Data, side: str = 'left') -> int:
+        # Posição da data nas linhas ordenadas, como np.searchsorted
+        ns = pd.Timestamp(data).value
+        dia = ns // tempo.NS_DIA - self.dia0
+        if dia < 0:
+            return 0
+        if dia >= len(self._acumulado) - 1:
+            return self.n
+        a, b = self._acumulado[dia], self._acumulado[dia + 1]
+        return int(a + np.searchsorted(self._ns[a:b], ns, side=side))
+
+    def slice(self, start: Data, finish: Data) -> slice:
+        # Linhas com start <= data_hora <= finish
+        inicio = self.position(start, 'left')
+        return slice(inicio, max(inicio, self.position(finish, 'right')))
+
+    def count(self, start: Data, finish: Data) -> int:
+        fatia = self.slice(start, finish)
+        return fatia.stop - fatia.start
+
+    def bounds(self) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+        # Primeira e última data; None sem linhas
+        if not self.n:
+            return None, None
+        return pd.Timestamp(self._ns[0]), pd.Timestamp(self._ns[-1])
+
+class FilterIndex:
+    # Índice invertido (coluna, valor) -> linhas, montado uma vez no carregamento.
+    # Cada valor guarda a lista ordenada de ids de linha em que aparece; uma
+    # combinação de filtros vira a interseção dessas listas. O período não
+    # passa pelas listas: vira uma fatia das linhas (DateIndex), e os outros
+    # filtros só olham dentro dela.
+
+    def __init__(self, df: pd.DataFrame, columns: list[str] = COLUNAS_FILTRO, version: str | None = None,
+                 cache: LRUCache | None = None):
+        self.n = len(df)
+        self.version = version
+        self.cache = cache
+        self.datas = DateIndex(df['data_hora'].to_numpy()) if 'data_hora' in df else None
+        self._codes = {}
+        self._values = {}
+        self._rows = {}
+        self._offsets = {}
+
+        for column in columns:
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+            codes = codes.astype(np.int32)
+            counts = np.bincount(codes, minlength=len(uniques))
+
+            self._codes[column] = codes
+            self._values[column] = pd.Index(uniques)
+            self._rows[column] = np.argsort(codes, kind='stable').astype(np.int32)
+            self._offsets[column] = np.concatenate(([0], np.cumsum(counts)))
+
+    def codes(self, column: str) -> np.ndarray:
+        # Código de cada linha na coluna (posição do valor em values(column))
+        return self._codes[column]
+
+    def values(self, column: str) -> pd.Index:
+        return self._values[column]
+
+    def lookup(self, column: str, values: Iterable) -> np.ndarray:
+        # Códigos dos valores na coluna, sem os ausentes; None (ver
+        # normalize_filters) e NaN são o valor vazio
+        uniques = self._values[column]
+        codes = uniques.get_indexer([v for v in values if _vazio(v) is not None])
+        if any(_vazio(v) is None for v in values):
+            codes = np.concatenate((codes, np.flatnonzero(uniques.isna())))
+        return codes[codes >= 0]
+
+    def postings(self, column: str, value: object) -> np.ndarray:
+        # Ids de linha (ordenados) em que a coluna tem esse valor
+        codes = self.lookup(column, [value])
+        code = codes[0] if len(codes) else -1
+        if code < 0:
+            return np.empty(0, dtype=np.int32)
+        offsets = self._offsets[column]
+        return self._rows[column][offsets[code]:offsets[code + 1]]
+
+    def bitmap(self, column: str, values: Iterable, janela: slice | None = None) -> np.ndarray:
+        # União dos valores escolhidos de uma coluna, dentro da janela de linhas
+        janela = slice(0, self.n) if janela is None else janela
+        bits = np.zeros(janela.stop - janela.start, dtype=bool)
+        for value in values:
+            rows = self.postings(column, value)
+            a, b = np.searchsorted(rows, [janela.start, janela.stop])
+            bits[rows[a:b] - janela.start] = True
+        return bits
+
+    def window(self, filters: Filters) -> slice:
+        # Fatia de linhas do período; todas as linhas sem filtro de data
+        for filter_value, column in filters:
+            if column == 'data_hora' and filter_value:
+                return self.datas.slice(*filter_value)
+        return slice(0, self.n)
+
+    def mask(self, filters: Filters, janela: slice | None = None) -> np.ndarray | None:
+        # Interseção dos filtros de valores, relativa ao início da janela;
+        # None quando nenhum deles está ativo
+        bits = None
+        for filter_value, column in filters:
+            if not filter_value or column == 'data_hora':
+                continue
+            values = filter_value if isinstance(filter_value, list) else [filter_value]
+            atual = self.bitmap(column, values, janela)
+            bits = atual if bits is None else bits & atual
+        return bits
+
+    def select(self, filters: Filters) -> np.ndarray | slice | None:
+        # Linhas que passam nos filtros: None sem filtros, uma fatia quando só
+        # o período está ativo, senão os ids guardados no cache pela versão
+        # dos dados e pela especificação normalizada dos filtros
+        spec = normalize_filters(filters)
+        if not spec:
+            return None
+        janela = self.window(filters)
+        if all(column == 'data_hora' for column, _ in spec):
+            return janela
+
+        key = ('select', self.version, spec)
+        rows = self.cache.get(key) if self.cache is not None else None
+        if rows is None:
+            rows = (janela.start + np.flatnonzero(self.mask(filters, janela))).astype(np.int32)
+            rows.flags.writeable = False
+            if self.cache is not None:
+                self.cache.put(key, rows)
+        return rows
+
+    def count(self, filters: Filters) -> int:
+        # Quantidade de linhas que passam nos filtros, sem montar o DataFrame
+        rows = self.select(filters)
+        if rows is None:
+            return self.n
+        if isinstance(rows, slice):
+            return rows.stop - rows.start
+        return len(rows)
+
+    def take(self, df: pd.DataFrame, filters: Filters) -> pd.DataFrame:
+        # Linhas de df (o mesmo DataFrame do índice) que passam nos filtros;
+        # só o período é uma fatia, sem cópia
+        rows = self.select(filters)
+        if rows is None:
+            return df
+        if isinstance(rows, slice):
+            return df.iloc[rows]
+        return df.take(rows)
+
+    def counts(self, column: str, filters: Filters) -> pd.Series:
+        # Cardinalidade da interseção de cada valor da coluna com os filtros
+        codes = self._codes[column]
+        rows = self.select(filters)
+        if rows is not None:
+            codes = codes[rows]
+        counts = np.bincount(codes, minlength=len(self._values[column]))
+        return pd.Series(counts, index=self._values[column], name=column)
+
+    def options(self, column: str, filters: Filters) -> list:
+        # Valores da coluna que ainda existem com os filtros aplicados
+        counts = self.counts(column, filters)
+        return counts.index[counts.to_numpy() > 0].tolist()
+
+def _ordem(value):
+    # Ordem das opções: números, depois textos em ordem alfabética (sem
+    # acento nem caixa), e vazios por último
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return (2, 0, '')
+    if isinstance(value, (int, float, np.number)):
+        return (0, value, '')
+    texto = unicodedata.normalize('NFKD', str(value))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return (1, 0, texto)
+
+class OptionCatalog:
+    # Catálogo das opções dos multiselects: valores distintos de cada coluna já
+    # ordenados e com as contagens, calculados no carregamento. As opções que
+    # dependem dos filtros anteriores saem das listas do FilterIndex e ficam no
+    # cache pelo estado dos filtros.
+
+    def __init__(self, index: FilterIndex, columns: list[str] = COLUNAS_FILTRO):
+        self.index = index
+        self.version = index.version
+        self.cache = index.cache
+        self._ordem = {}
+        self._totais = {}
+
+        for column in columns:
+            valores = index.values(column)
+            ordem = np.array(sorted(range(len(valores)), key=lambda c: _ordem(valores[c])), dtype=np.int64)
+            contagem = np.bincount(index.codes(column), minlength=len(valores))[ordem]
+            self._ordem[column] = ordem
+            self._totais[column] = pd.Series(contagem, index=valores[ordem], name=column)
+
+        # As duas ruas de cada interseção, tiradas da primeira linha em que ela aparece
+        if 'interseccao' in columns:
+            codigos, primeiro = np.unique(index.codes('interseccao'), return_index=True)
+            self._ruas = pd.DataFrame({
+                'a': index.values('logradouro')[index.codes('logradouro')[primeiro]],
+                'b': index.values('cruzamento')[index.codes('cruzamento')[primeiro]],
+            }, index=index.values('interseccao')[codigos])
+
+    def counts(self, column: str, filters: Filters) -> pd.Series:
+        # Contagem de cada valor com os filtros, só os presentes, na ordem do catálogo
+        spec = normalize_filters(filters)
+        if not spec:
+            totais = self._totais[column]
+            return totais[totais.to_numpy() > 0]
+
+        key = ('opcoes', self.version, column, spec)
+        counts = self.cache.get(key) if self.cache is not None else None
+        if counts is None:
+            contagem = self.index.counts(column, filters).to_numpy()[self._ordem[column]]
+            counts = pd.Series(contagem, index=self._totais[column].index, name=column)
+            counts = counts[contagem > 0]
+            if self.cache is not None:
+                self.cache.put(key, counts)
+        return counts
+
+    def options(self, column: str, filters: Filters) -> list:
+        return self.counts(column, filters).index.tolist()
+
+    def intersections(self, filters: Filters, streets: list[str] | None = None) -> list[str]:
+        # Interseções presentes com os filtros; com ruas escolhidas, só as que
+        # envolvem alguma delas, em qualquer posição
+        counts = self.counts('interseccao', filters)
+        counts = counts[counts.index.notna()]
+        if streets:
+            ruas = self._ruas.loc[counts.index]
+            counts = counts[(ruas['a'].isin(streets) | ruas['b'].isin(streets)).to_numpy()]
+        return counts.index.tolist()
+
+    def warm(self, filters: Filters, columns: list[str] = COLUNAS_FILTRO) -> None:
+        # Pré-calcula as opções de todas as colunas para um estado dos filtros
+        # (por exemplo, o período padrão da página sem nenhuma seleção)
+        for column in columns:
+            self.counts(column, filters)
@@ -0,0 +1,89 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from cpmu import tempo
+from cpmu.cubo import AccidentCube
+from cpmu.filtros import Filters
+
+# Gráficos da aba de Gráficos: primeiro as tabelas, somadas a partir do cubo
+# (cpmu/cubo.py), depois as figuras, montadas só a partir das tabelas.
+
+def aggregations(cubo: AccidentCube, filters: Filters) -> dict[str, pd.DataFrame]:
+    # Tabelas de cada gráfico sob os filtros, na ordem da página
+    logradouros = cubo.counts('logradouro', filters).head(10).reset_index()
+    logradouros.columns = ['Logradouro', 'Contagem']
+
+    gravidade = cubo.counts('gravidade', filters).reset_index()
+    gravidade.columns = ['Gravidade', 'Contagem']
+
+    cruzamentos = cubo.crossings(filters).head(10).reset_index()
+    cruzamentos.columns = ['Cruzamento', 'Contagem']
+
+    condicoes = cubo.counts('tempo', filters).reset_index()
+    condicoes.columns = ['Tempo', 'Contagem']
+
+    slots, contagem = cubo.slots(filters)
+    horarios, counts = tempo.half_hour_counts(slots, contagem)
+    horas = pd.DataFrame({'Horário': horarios, 'Contagem': counts})
+
+    meses, counts = tempo.monthly_counts(slots, contagem)
+    mensal = pd.DataFrame({'data_hora': meses, 'Contagem': counts})
+    mensal['Mês'] = mensal['data_hora'].astype(str)
+
+    semanas, counts = tempo.weekly_counts(slots, contagem)
+    semanal = pd.DataFrame({'Semana': semanas, 'Contagem': counts})
+
+    return {'logradouros': logradouros, 'gravidade': gravidade, 'cruzamentos': cruzamentos,
+            'tempo': condicoes, 'horarios': horas, 'meses': mensal, 'semanas': semanal}
+
+def street_chart(logradouros: pd.DataFrame) -> go.Figure:
+    fig = px.bar(logradouros, x='Contagem', y='Logradouro', orientation='h',
+                 title="Logradouros com Mais Acidentes")
+    fig.update_layout(
+        xaxis_title="Contagem de Acidentes",
+        yaxis_title="Logradouro",
+        yaxis_tickfont=dict(size=10))
+    return fig
+
+def severity_chart(gravidade: pd.DataFrame) -> go.Figure:
+    return px.pie(gravidade, names='Gravidade', values='Contagem', title='Distribuição de Gravidade')
+
+def crossing_chart(cruzamentos: pd.DataFrame) -> go.Figure:
+    fig = px.bar(cruzamentos, x='Contagem', y='Cruzamento', orientation='h',
+                 title="Cruzamentos com Mais Acidentes")
+    fig.update_layout(
+        xaxis_title="Contagem de Acidentes",
+        yaxis_title="Cruzamento",
+        yaxis_tickfont=dict(size=10))
+    return fig
+
+def weather_chart(condicoes: pd.DataFrame) -> go.Figure:
+    return px.pie(condicoes, names='Tempo', values='Contagem', title='Condições Climáticas')
+
+def hour_chart(horas: pd.DataFrame) -> go.Figure:
+    fig = px.histogram(horas, x='Horário', y='Contagem',
+                       title='Histograma de Contagem de Acidentes por Horário', nbins=24)
+    fig.update_layout(
+        xaxis_title='Horário',
+        yaxis_title='Contagem',
+        xaxis_tickangle=-45,
+        showlegend=True)
+    return fig
+
+def monthly_chart(mensal: pd.DataFrame) -> go.Figure:
+    fig = px.area(mensal, x='Mês', y='Contagem', title='Contagem de Acidentes por Mês')
+    fig.update_layout(xaxis_title='Mês', yaxis_title='Contagem', showlegend=True)
+    return fig
+
+def weekly_chart(semanal: pd.DataFrame) -> go.Figure:
+    fig = px.area(semanal, x='Semana', y='Contagem', title='Contagem de Acidentes por Semana')
+    fig.update_layout(xaxis_title='Semana', yaxis_title='Contagem', showlegend=True)
+    return fig
+
+GRAFICOS = {'logradouros': street_chart, 'gravidade': severity_chart, 'cruzamentos': crossing_chart,
+            'tempo': weather_chart, 'horarios': hour_chart, 'meses': monthly_chart, 'semanas': weekly_chart}
+
+def charts(tabelas: dict[str, pd.DataFrame]) -> dict[str, go.Figure]:
+    # Uma figura por tabela de aggregations
+    return {nome: GRAFICOS[nome](tabela) for nome, tabela in tabelas.items()}
@@ -0,0 +1,88 @@
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+# Centro de Santos, usado na projeção local em metros
+LAT0 = -23.959
+LON0 = -46.342
+METROS_LAT = 110540.0
+METROS_LON = 111320.0 * np.cos(np.radians(LAT0))
+
+# Coluna e peso de cada gravidade, na linha da UPS (Unidade Padrão de Severidade)
+PESOS_GRAVIDADE = {
+    'S/ LESÃO': ('sem_lesao', 1),
+    'C/ VÍTIMAS LEVES': ('leves', 4),
+    'C/ VÍTIMAS GRAVES': ('graves', 6),
+    'C/ VÍTIMAS FATAIS': ('fatais', 13)
+}
+
+# Mesma escala de cores padrão do HexagonLayer do deck.gl
+CORES = np.array([
+    [255, 255, 178],
+    [254, 217, 118],
+    [254, 178, 76],
+    [253, 141, 60],
+    [240, 59, 32],
+    [189, 0, 38]
+])
+
+def _hex_round(q, r):
+    # Arredondamento em coordenadas cúbicas para o hexágono mais próximo
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    corrige_q = (dq > dr) & (dq > ds)
+    corrige_r = ~corrige_q & (dr > ds)
+    rq = np.where(corrige_q, -rr - rs, rq)
+    rr = np.where(corrige_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+def hex_bins(df: pd.DataFrame, radius: float = 70) -> pd.DataFrame:
+    # Agrupa os acidentes em hexágonos de raio `radius` metros, no servidor.
+    # Devolve uma linha por hexágono com o centro, o total, o total de cada
+    # gravidade e o total ponderado pela gravidade.
+    x = (df['lon'].to_numpy() - LON0) * METROS_LON
+    y = (df['lat'].to_numpy() - LAT0) * METROS_LAT
+    q, r = _hex_round((np.sqrt(3) / 3 * x - y / 3) / radius, (2 / 3 * y) / radius)
+
+    chaves, celula = np.unique(np.stack([q, r], axis=1), axis=0, return_inverse=True)
+    celula = celula.ravel()
+    n = len(chaves)
+
+    cx = radius * (np.sqrt(3) * chaves[:, 0] + np.sqrt(3) / 2 * chaves[:, 1])
+    cy = radius * (1.5 * chaves[:, 1])
+    cells = pd.DataFrame({
+        'lat': LAT0 + cy / METROS_LAT,
+        'lon': LON0 + cx / METROS_LON,
+        'total': np.bincount(celula, minlength=n)
+    })
+
+    gravidades = df['gravidade'].to_numpy()
+    pesos = np.zeros(len(df))
+    for gravidade, (coluna, peso) in PESOS_GRAVIDADE.items():
+        mascara = gravidades == gravidade
+        cells[coluna] = np.bincount(celula[mascara], minlength=n)
+        pesos[mascara] = peso
+    cells['ponderado'] = np.bincount(celula, weights=pesos, minlength=n)
+    return cells
+
+def elevation_colors(valores: npt.ArrayLike, upper_percentile: float = 99,
+                     elevation_range: tuple[float, float] = (0, 1000)) -> tuple[np.ndarray, np.ndarray]:
+    # Altura e cor de cada hexágono, cortando no percentil superior como o
+    # HexagonLayer fazia no navegador
+    valores = np.asarray(valores, dtype=float)
+    if not len(valores):
+        return np.empty(0), np.empty((0, 3), dtype=int)
+    topo = max(np.percentile(valores, upper_percentile), 1)
+    escala = np.clip(valores / topo, 0, 1)
+    elevacao = elevation_range[0] + escala * (elevation_range[1] - elevation_range[0])
+    cores = CORES[np.minimum((escala * len(CORES)).astype(int), len(CORES) - 1)]
+    return elevacao, cores
+
+def column_data(cells: pd.DataFrame, ponderado: bool = False) -> pd.DataFrame:
+    # Hexágonos com a altura e a cor do ColumnLayer, pelo total ou pelo ponderado
+    cells = cells.copy()
+    elevacao, cores = elevation_colors(cells['ponderado' if ponderado else 'total'])
+    cells['elevacao'] = elevacao
+    cells['cor'] = cores.tolist()
+    return cells
@@ -0,0 +1,181 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cpmu import tempo
+from cpmu.hexagonos import PESOS_GRAVIDADE
+from cpmu.tempo import Data
+
+# Pontos críticos: contagens semanais por local (logradouro ou interseção)
+# numa tabela esparsa, só com as semanas em que o local teve acidentes. As
+# entradas (local, semana) ficam ordenadas por local e semana, com as somas
+# acumuladas da contagem, do ponderado (UPS) e de semana × ponderado ao longo
+# delas. O total e o ponderado de um local em qualquer janela saem da diferença
+# das somas nas posições (busca binária) do começo e do fim da janela, e a
+# tendência (inclinação da reta dos mínimos quadrados do ponderado semanal)
+# sai das somas de y e de t * y, sem voltar às linhas.
+
+HOTSPOTS_PATH = 'data/hotspots_{}.npz'
+
+# Semanas do fim da janela usadas na tendência (um trimestre)
+SEMANAS_TENDENCIA = 13
+
+# Chave de cada entrada: local * SEMANAS_MAX + semana
+SEMANAS_MAX = 1 << 20
+
+def _semana(datas):
+    # Dia (desde 1970) da segunda-feira da semana de cada data
+    dias = tempo.as_int64(datas) // tempo.NS_DIA
+    return dias - (dias + 3) % 7
+
+def _pesos(gravidades):
+    pesos = np.zeros(len(gravidades), dtype=np.int64)
+    for gravidade, (_, peso) in PESOS_GRAVIDADE.items():
+        pesos[gravidades == gravidade] = peso
+    return pesos
+
+class HotspotEngine:
+    # Uma instância por dimensão ('logradouro' ou 'interseccao'). Os dados de
+    # acidentes vêm ordenados por data_hora, então update() soma só as linhas
+    # depois da última já contada e junta as entradas delas às da tabela.
+
+    def __init__(self, column: str):
+        self.column = column
+        self.locais = pd.Index([], dtype=object)
+        self.semana0 = None
+        self.ultimo = None
+        self.linhas = 0
+        self.semanas = 0
+        self._chave = np.empty(0, dtype=np.int64)
+        self._contagem = np.zeros(1, dtype=np.int32)
+        self._ponderado = np.zeros(1, dtype=np.int64)
+        self._tempo_ponderado = np.zeros(1, dtype=np.int64)
+
+    def update(self, df: pd.DataFrame) -> bool:
+        # Soma as linhas novas; devolve True quando algo mudou. Se o histórico
+        # já contado não bate (linhas removidas ou inseridas antes do fim),
+        # recomeça do zero.
+        datas = df['data_hora'].to_numpy()
+        if self.ultimo is not None:
+            contadas = np.searchsorted(datas, self.ultimo, side='right')
+            if contadas != self.linhas:
+                self.__init__(self.column)
+                contadas = 0
+        else:
+            contadas = 0
+        if contadas == len(df):
+            return False
+
+        novas = df.iloc[contadas:]
+        locais = novas[self.column].to_numpy()
+        validos = ~pd.isna(locais)
+        semana = _semana(novas['data_hora'].to_numpy()[validos])
+        if self.semana0 is None:
+            self.semana0 = int(semana.min()) if len(semana) else int(_semana(datas[:1])[0])
+        t = (semana - self.semana0) // 7
+
+        novos = pd.Index(pd.unique(locais[validos])).difference(self.locais, sort=False)
+        if len(novos):
+            self.locais = self.locais.append(novos)
+        linha = self.locais.get_indexer(locais[validos]).astype(np.int64)
+        self._merge(linha * SEMANAS_MAX + t, _pesos(novas['gravidade'].to_numpy()[validos]))
+        if len(t):
+            self.semanas = max(self.semanas, int(t.max()) + 1)
+
+        self.ultimo = datas[-1]
+        self.linhas = len(df)
+        return True
+
+    def _merge(self, chaves, pesos):
+        # Junta as linhas novas (uma chave por acidente) às entradas da tabela
+        # e refaz as somas acumuladas, que só dependem das entradas
+        if not len(chaves):
+            return
+        chaves = np.concatenate([self._chave, chaves])
+        contagem = np.concatenate([np.diff(self._contagem), np.ones(len(pesos), dtype=np.int64)])
+        ponderado = np.concatenate([np.diff(self._ponderado), pesos])
+        self._chave, posicao = np.unique(chaves, return_inverse=True)
+        posicao = posicao.ravel()
+        contagem = np.rint(np.bincount(posicao, weights=contagem)).astype(np.int64)
+        ponderado = np.rint(np.bincount(posicao, weights=ponderado)).astype(np.int64)
+        semana = self._chave % SEMANAS_MAX
+        self._contagem = np.concatenate(([0], np.cumsum(contagem))).astype(np.int32)
+        self._ponderado = np.concatenate(([0], np.cumsum(ponderado)))
+        self._tempo_ponderado = np.concatenate(([0], np.cumsum(semana * ponderado)))
+
+    def _coluna(self, data):
+        # Semana da data, contada desde a primeira (negativa antes dela)
+        semana = _semana(np.array([np.datetime64(pd.Timestamp(data), 'ns')]))[0]
+        return int((semana - self.semana0) // 7)
+
+    def window(self, inicio: Data, fim: Data) -> tuple[int, int]:
+        # Semanas [a, b) inteiras que cobrem o período; vazia quando o período
+        # termina antes da primeira semana ou começa depois da última (semana0
+        # das interseções é a primeira semana com uma, não a dos dados)
+        if self.semana0 is None:
+            return 0, 0
+        a, b = self._coluna(inicio), self._coluna(fim) + 1
+        if b <= 0 or a >= self.semanas:
+            return 0, 0
+        return max(a, 0), min(b, self.semanas)
+
+    def _posicoes(self, semana):
+        # Posição, para cada local, da primeira entrada a partir da semana
+        base = np.arange(len(self.locais), dtype=np.int64) * SEMANAS_MAX
+        return np.searchsorted(self._chave, base + semana)
+
+    def ranking(self, inicio: Data, fim: Data, by: str = 'ponderado', top: int = 10,
+                semanas_tendencia: int = SEMANAS_TENDENCIA) -> pd.DataFrame:
+        # Locais do período ordenados por total ou ponderado, com a tendência
+        # do ponderado nas últimas semanas da janela (UPS por semana)
+        a, b = self.window(inicio, fim)
+        c = max(a, b - semanas_tendencia)
+        pa, pb, pc = self._posicoes(a), self._posicoes(b), self._posicoes(c)
+        total = self._contagem[pb] - self._contagem[pa]
+        ponderado = self._ponderado[pb] - self._ponderado[pa]
+
+        n = b - c
+        y = (self._ponderado[pb] - self._ponderado[pc]).astype(float)
+        ty = (self._tempo_ponderado[pb] - self._tempo_ponderado[pc]).astype(float)
+        t = np.arange(c, b, dtype=float)
+        denominador = n * (t * t).sum() - t.sum() ** 2
+        tendencia = (n * ty - t.sum() * y) / denominador if denominador > 0 else np.zeros(len(y))
+
+        ranking = pd.DataFrame({'acidentes': total, 'ponderado': ponderado, 'tendencia': tendencia},
+                               index=pd.Index(self.locais, name=self.column))
+        ranking = ranking[ranking['acidentes'] > 0]
+        return ranking.sort_values(by, ascending=False, kind='stable').head(top)
+
+    def save(self, path: str | None = None) -> None:
+        if self.semana0 is None:
+            return
+        path = path or HOTSPOTS_PATH.format(self.column)
+        temporario = path + '.tmp.npz'
+        np.savez_compressed(temporario, locais=self.locais.to_numpy(dtype=str),
+                            semana0=self.semana0, ultimo=self.ultimo, linhas=self.linhas,
+                            semanas=self.semanas, chave=self._chave, contagem=self._contagem,
+                            ponderado=self._ponderado, tempo_ponderado=self._tempo_ponderado)
+        os.replace(temporario, path)
+
+    @classmethod
+    def load(cls, column: str, path: str | None = None) -> 'HotspotEngine':
+        # Tabela gravada antes; sem arquivo (ou no formato denso antigo), um
+        # motor vazio, que update() preenche do zero
+        path = path or HOTSPOTS_PATH.format(column)
+        engine = cls(column)
+        if not os.path.exists(path):
+            return engine
+        with np.load(path) as dados:
+            if 'chave' not in dados:
+                return engine
+            engine.locais = pd.Index(dados['locais'].astype(object))
+            engine.semana0 = int(dados['semana0'])
+            engine.ultimo = dados['ultimo'].astype('datetime64[ns]')
+            engine.linhas = int(dados['linhas'])
+            engine.semanas = int(dados['semanas'])
+            engine._chave = dados['chave']
+            engine._contagem = dados['contagem']
+            engine._ponderado = dados['ponderado']
+            engine._tempo_ponderado = dados['tempo_ponderado']
+        return engine
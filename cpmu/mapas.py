@@ -0,0 +1,87 @@
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import Draw, Geocoder
+
+from cpmu.espacial import GridIndex, cell_for_zoom, cluster_points
+from cpmu.operacoes import CAMPOS_POPUP, ROTULOS_POPUP, feature_collection
+
+# Mapas das páginas de operações (folium)
+
+CENTRO = (-23.953469450472493, -46.34634017944336)
+
+# A partir deste zoom os pontos não são mais agrupados
+ZOOM_SEM_AGRUPAR = 16
+
+def base_map() -> folium.Map:
+    tl = folium.TileLayer(
+        tiles='https://{s}.tile.openstreetmap.fr/hot/{z}/{x}/{y}.png',
+        attr='Map data © OpenStreetMap contributors',
+        name='OpenStreetMap HOT',
+        overlay=True,
+        control=True
+    )
+    return folium.Map(tiles=tl, location=CENTRO, zoom_start=13)
+
+def draw_map() -> folium.Map:
+    # Mapa para desenhar o local da operação (ponto ou linha)
+    m = base_map()
+    Draw(export=False, draw_options={'polyline': True,
+                                     'polygon': False,
+                                     'rectangle': False,
+                                     'circle': False,
+                                     'marker': True,
+                                     'circlemarker': False
+                                     }, position='bottomleft').add_to(m)
+    Geocoder(position='topleft', add_marker=True).add_to(m)
+    return m
+
+def visible_ids(df: pd.DataFrame, indice: GridIndex, bounds: dict | None, margem: float = 0.5) -> np.ndarray:
+    # Operações dentro da área visível (com uma margem), pelo índice espacial;
+    # sem área conhecida, todas as que têm geometria
+    if not bounds or not bounds.get('_southWest') or bounds['_southWest'].get('lat') is None:
+        return np.flatnonzero(df['geom_tipo'].notna().to_numpy())
+    sul, oeste = bounds['_southWest']['lat'], bounds['_southWest']['lng']
+    norte, leste = bounds['_northEast']['lat'], bounds['_northEast']['lng']
+    margem_lat, margem_lon = (norte - sul) * margem, (leste - oeste) * margem
+    return indice.query_bbox(oeste - margem_lon, sul - margem_lat, leste + margem_lon, norte + margem_lat)
+
+def operation_layers(df: pd.DataFrame, features: list[dict | None], ids: np.ndarray,
+                     zoom: int) -> folium.FeatureGroup:
+    # Só o que está visível: uma camada GeoJSON para as linhas, outra para os
+    # pontos soltos e um marcador com a contagem para cada grupo de pontos
+    grupo = folium.FeatureGroup(name='Operações')
+    estilo_popup = 'color: darkgreen; font-size: 16px; font-family: Arial, sans-serif;'
+    tipos = df['geom_tipo'].to_numpy()[ids]
+
+    linhas = ids[tipos == 'LineString']
+    if len(linhas):
+        folium.GeoJson(
+            feature_collection(features, linhas),
+            style_function=lambda feature: {'color': 'blue', 'weight': 2.5, 'opacity': 0.7},
+            popup=folium.GeoJsonPopup(fields=CAMPOS_POPUP, aliases=ROTULOS_POPUP, style=estilo_popup)
+        ).add_to(grupo)
+
+    pontos = ids[tipos == 'Point']
+    soltos = pontos
+    if len(pontos) and zoom < ZOOM_SEM_AGRUPAR:
+        lon, lat, quantos, _, celula = cluster_points(df['min_lon'].to_numpy()[pontos],
+                                                      df['min_lat'].to_numpy()[pontos],
+                                                      cell_for_zoom(zoom))
+        soltos = pontos[quantos[celula] == 1]
+        for i in np.flatnonzero(quantos > 1):
+            folium.Marker(
+                location=[lat[i], lon[i]],
+                icon=folium.DivIcon(html=f'<div style="background: darkgreen; color: white; '
+                                         f'border-radius: 50%; width: 30px; height: 30px; '
+                                         f'line-height: 30px; text-align: center; '
+                                         f'font-family: Arial, sans-serif;">{quantos[i]}</div>'),
+                tooltip=f'{quantos[i]} operações'
+            ).add_to(grupo)
+    if len(soltos):
+        folium.GeoJson(
+            feature_collection(features, soltos),
+            marker=folium.Marker(icon=folium.Icon(color="green", prefix="fa", icon="person-digging")),
+            popup=folium.GeoJsonPopup(fields=CAMPOS_POPUP, aliases=ROTULOS_POPUP, style=estilo_popup)
+        ).add_to(grupo)
+    return grupo
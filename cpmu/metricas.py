@@ -0,0 +1,156 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Métricas no formato texto do Prometheus (reescrito) e um log JSON por rerun
+METRICAS_PATH = 'data/metricas.prom'
+LOG_PATH = 'data/metricas.jsonl'
+
+# Acima deste tamanho o log vira metricas.jsonl.1 (o anterior é descartado)
+MAX_LOG_BYTES = 20 * 1024 * 1024
+
+def payload_size(objeto: object) -> int:
+    # Tamanho aproximado, em bytes, do que vai para o navegador: tabelas vão
+    # em Arrow, figuras do plotly e do pydeck em JSON
+    if isinstance(objeto, pd.DataFrame):
+        return pa.Table.from_pandas(objeto, preserve_index=False).nbytes
+    return len(objeto.to_json().encode())
+
+class RerunProfile:
+    # Tempo de cada etapa de um rerun e tamanho de cada gráfico enviado.
+    # Medir o tamanho serializa a figura de novo, por isso só é feito quando
+    # pedido (painel de desempenho aberto).
+
+    def __init__(self, pagina: str, payloads: bool = False):
+        self.pagina = pagina
+        self.medir_payloads = payloads
+        self.spans = {}
+        self.payloads = {}
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def span(self, nome: str) -> Iterator[None]:
+        # Etapas com o mesmo nome somam os tempos
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[nome] = self.spans.get(nome, 0.0) + time.perf_counter() - inicio
+
+    def payload(self, nome: str, objeto: object) -> None:
+        if self.medir_payloads:
+            self.payloads[nome] = payload_size(objeto)
+
+    def total(self) -> float:
+        return time.perf_counter() - self._inicio
+
+def _rotulos(**rotulos):
+    return ','.join(f'{k}="{v}"' for k, v in rotulos.items())
+
+class MetricsRegistry:
+    # Acumula os reruns de todas as sessões do processo. Cada rerun vira uma
+    # linha no log, guardada em memória; o log e o arquivo do Prometheus são
+    # gravados juntos, no máximo a cada `interval` segundos, e de novo na
+    # saída do processo (linhas de um processo morto à força se perdem). Um
+    # erro ao gravar só vai para o logging: as métricas não derrubam a página.
+
+    def __init__(self, path: str = METRICAS_PATH, log_path: str = LOG_PATH, interval: float = 5.0,
+                 max_log_bytes: int = MAX_LOG_BYTES):
+        self.path = path
+        self.log_path = log_path
+        self.interval = interval
+        self.max_log_bytes = max_log_bytes
+        self._linhas = []
+        self._etapas = {}
+        self._reruns = {}
+        self._payloads = {}
+        self._caches = {}
+        self._escrito = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def observe(self, profile: RerunProfile, caches: dict[str, dict] | None = None) -> None:
+        total = profile.total()
+        with self._lock:
+            contagem, soma = self._reruns.get(profile.pagina, (0, 0.0))
+            self._reruns[profile.pagina] = (contagem + 1, soma + total)
+            for nome, segundos in profile.spans.items():
+                contagem, soma = self._etapas.get((profile.pagina, nome), (0, 0.0))
+                self._etapas[profile.pagina, nome] = (contagem + 1, soma + segundos)
+            for nome, tamanho in profile.payloads.items():
+                self._payloads[profile.pagina, nome] = tamanho
+            self._caches.update(caches or {})
+
+            linha = {'ts': time.time(), 'pagina': profile.pagina, 'total': total,
+                     'spans': profile.spans, 'payloads': profile.payloads}
+            self._linhas.append(json.dumps(linha) + '\n')
+
+            if time.monotonic() - self._escrito >= self.interval:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._write()
+        self._write_log()
+        self._escrito = time.monotonic()
+
+    def text(self) -> str:
+        # Métricas no formato texto do Prometheus
+        linhas = ['# TYPE cpmu_rerun_seconds summary']
+        for pagina, (contagem, soma) in sorted(self._reruns.items()):
+            linhas.append(f'cpmu_rerun_seconds_count{{{_rotulos(pagina=pagina)}}} {contagem}')
+            linhas.append(f'cpmu_rerun_seconds_sum{{{_rotulos(pagina=pagina)}}} {soma:.6f}')
+        linhas.append('# TYPE cpmu_etapa_seconds summary')
+        for (pagina, etapa), (contagem, soma) in sorted(self._etapas.items()):
+            rotulos = _rotulos(pagina=pagina, etapa=etapa)
+            linhas.append(f'cpmu_etapa_seconds_count{{{rotulos}}} {contagem}')
+            linhas.append(f'cpmu_etapa_seconds_sum{{{rotulos}}} {soma:.6f}')
+        linhas.append('# TYPE cpmu_payload_bytes gauge')
+        for (pagina, grafico), tamanho in sorted(self._payloads.items()):
+            linhas.append(f'cpmu_payload_bytes{{{_rotulos(pagina=pagina, grafico=grafico)}}} {tamanho}')
+        for campo, nome, tipo in (('hits', 'hits_total', 'counter'), ('misses', 'misses_total', 'counter'),
+                                  ('evictions', 'evictions_total', 'counter'),
+                                  ('entries', 'entries', 'gauge'), ('bytes', 'bytes', 'gauge')):
+            linhas.append(f'# TYPE cpmu_cache_{nome} {tipo}')
+            for cache, stats in sorted(self._caches.items()):
+                linhas.append(f'cpmu_cache_{nome}{{{_rotulos(cache=cache)}}} {stats[campo]}')
+        return '\n'.join(linhas) + '\n'
+
+    def _write(self):
+        # Troca atômica, para quem lê o arquivo nunca ver ele pela metade
+        temporario = self.path + '.tmp'
+        try:
+            with open(temporario, 'w') as arquivo:
+                arquivo.write(self.text())
+            os.replace(temporario, self.path)
+        except OSError:
+            logger.exception('Falha ao gravar as métricas em %s', self.path)
+
+    def _write_log(self):
+        # As linhas saem do buffer mesmo se a gravação falhar, para ele não
+        # crescer sem limite com o disco cheio ou só de leitura
+        if not self._linhas:
+            return
+        texto = ''.join(self._linhas)
+        self._linhas = []
+        try:
+            tamanho = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+            if tamanho and tamanho + len(texto) > self.max_log_bytes:
+                os.replace(self.log_path, self.log_path + '.1')
+            with open(self.log_path, 'a') as arquivo:
+                arquivo.write(texto)
+        except OSError:
+            logger.exception('Falha ao gravar o log de métricas em %s', self.log_path)
@@ -0,0 +1,108 @@
+import ast
+import json
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+CSV_PATH = 'data/operacoes.csv'
+
+COLUNAS = ['nome', 'tipo', 'concessionaria', 'responsavel', 'ctt_responsavel',
+           'logradouro', 'numero', 'cruzamento', 'dt_inicio', 'hr_inicio',
+           'dt_fim_prev', 'hr_fim_prev', 'dt_fim', 'hr_fim', 'descricao', 'local']
+
+# Campos do formulário de inserção, na ordem em que aparecem; o fim real
+# (dt_fim, hr_fim) fica vazio ao salvar
+CAMPOS_FORMULARIO = [c for c in COLUNAS if c not in ('dt_fim', 'hr_fim')]
+
+def form_record(valores: Sequence) -> dict:
+    registro = dict(zip(CAMPOS_FORMULARIO, valores))
+    registro.update(dt_fim=None, hr_fim=None)
+    return {c: registro[c] for c in COLUNAS}
+
+# Colunas calculadas na leitura a partir do GeoJSON em 'local'
+COLUNAS_GEOMETRIA = ['geom_tipo', 'coords', 'min_lon', 'min_lat', 'max_lon', 'max_lat']
+
+def dump_local(feature: dict) -> str:
+    # GeoJSON do desenho, serializado uma vez ao salvar
+    return json.dumps(feature, ensure_ascii=False, separators=(',', ':'))
+
+def parse_local(texto: object) -> dict | None:
+    # 'local' é GeoJSON; linhas antigas guardavam o repr do dict em Python
+    if not isinstance(texto, str) or not texto:
+        return None
+    try:
+        feature = json.loads(texto)
+    except json.JSONDecodeError:
+        feature = ast.literal_eval(texto)
+    if feature is None:
+        return None
+    return feature.get('geometry', feature)
+
+def geometry_columns(locais: Iterable) -> pd.DataFrame:
+    # Tipo, coordenadas (lon, lat) em array e caixa envolvente de cada geometria
+    tipos, coords, caixas = [], [], []
+    for texto in locais:
+        geometria = parse_local(texto)
+        if geometria is None:
+            tipos.append(None)
+            coords.append(np.empty((0, 2)))
+            caixas.append((np.nan,) * 4)
+            continue
+        pontos = np.asarray(geometria['coordinates'], dtype=float).reshape(-1, 2)
+        tipos.append(geometria['type'])
+        coords.append(pontos)
+        caixas.append((*pontos.min(axis=0), *pontos.max(axis=0)))
+
+    caixas = np.asarray(caixas, dtype=float).reshape(-1, 4)
+    return pd.DataFrame({
+        'geom_tipo': tipos,
+        'coords': coords,
+        'min_lon': caixas[:, 0],
+        'min_lat': caixas[:, 1],
+        'max_lon': caixas[:, 2],
+        'max_lat': caixas[:, 3],
+    })
+
+def with_geometry(dados: pd.DataFrame) -> pd.DataFrame:
+    # Acrescenta as colunas de geometria, lendo cada 'local' uma única vez
+    geometria = geometry_columns(dados['local'])
+    geometria.index = dados.index
+    return pd.concat([dados, geometria], axis=1)
+
+def read_operacoes(csv_path: str = CSV_PATH) -> pd.DataFrame:
+    return with_geometry(pd.read_csv(csv_path))
+
+# Campos do popup de cada operação, montado no navegador a partir das propriedades
+CAMPOS_POPUP = ['nome', 'inicio', 'endereco', 'responsavel', 'descricao']
+ROTULOS_POPUP = ['', 'Data e hora de início:', 'Endereço:', 'Responsável:', 'Descrição da operaçao:']
+
+def popup_properties(dados: pd.DataFrame) -> pd.DataFrame:
+    # Propriedades de cada operação montadas coluna a coluna
+    texto = lambda coluna: dados[coluna].astype(str)
+    return pd.DataFrame({
+        'nome': texto('nome'),
+        'inicio': texto('dt_inicio') + ' ' + texto('hr_inicio'),
+        'endereco': texto('logradouro') + ' ' + texto('numero') + ' ' + texto('cruzamento'),
+        'responsavel': texto('responsavel'),
+        'descricao': texto('descricao'),
+    }, index=dados.index)
+
+def build_features(dados: pd.DataFrame) -> list[dict | None]:
+    # Uma Feature GeoJSON por operação, na mesma ordem das linhas (None quando
+    # a geometria não é ponto nem linha)
+    propriedades = popup_properties(dados).to_dict('records')
+    features = []
+    for tipo, coords, props in zip(dados['geom_tipo'], dados['coords'], propriedades):
+        if tipo == 'Point':
+            geometria = {'type': 'Point', 'coordinates': coords[0].tolist()}
+        elif tipo == 'LineString':
+            geometria = {'type': 'LineString', 'coordinates': coords.tolist()}
+        else:
+            features.append(None)
+            continue
+        features.append({'type': 'Feature', 'properties': props, 'geometry': geometria})
+    return features
+
+def feature_collection(features: list[dict | None], ids: Iterable[int]) -> dict:
+    return {'type': 'FeatureCollection', 'features': [features[i] for i in ids]}
@@ -0,0 +1,133 @@
+import datetime
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from cpmu import tempo
+from cpmu.cache import LRUCache
+from cpmu.espacial import GridIndex
+from cpmu.hexagonos import LAT0, LON0, METROS_LAT, METROS_LON, PESOS_GRAVIDADE
+from cpmu.operacoes import parse_local
+
+def _metros(lon, lat):
+    # Projeção local em metros, a mesma dos hexágonos
+    return (np.asarray(lon) - LON0) * METROS_LON, (np.asarray(lat) - LAT0) * METROS_LAT
+
+def _data(valor):
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)) or valor == '':
+        return None
+    return pd.Timestamp(str(valor)).date() if not isinstance(valor, datetime.date) else valor
+
+def _minutos(valor):
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)) or valor == '':
+        return None
+    if not isinstance(valor, datetime.time):
+        valor = datetime.time.fromisoformat(str(valor))
+    return valor.hour * 60 + valor.minute
+
+class ProximityJoin:
+    # Junção espaço-temporal entre operações e o histórico de acidentes: para
+    # uma geometria (ponto ou linha), conta os acidentes a até `buffer_m`
+    # metros que caíram nos mesmos dias da semana e na mesma faixa de horário
+    # da operação. Os candidatos saem do GridIndex; a distância exata até a
+    # linha é calculada em bloco para todos os candidatos e segmentos.
+
+    def __init__(self, acidentes: pd.DataFrame, version: str | None = None, cache: LRUCache | None = None):
+        self.version = version
+        self.cache = cache
+        self._x, self._y = _metros(acidentes['lon'].to_numpy(), acidentes['lat'].to_numpy())
+        self._lon = acidentes['lon'].to_numpy()
+        self._lat = acidentes['lat'].to_numpy()
+        ts = acidentes['data_hora'].to_numpy()
+        self._dia = tempo.dia_semana(ts)
+        self._minuto = ((tempo.as_int64(ts) % tempo.NS_DIA) // tempo.NS_MINUTO).astype(np.int32)
+
+        gravidades = acidentes['gravidade'].to_numpy()
+        self._gravidade = np.full(len(acidentes), -1, dtype=np.int8)
+        self._peso = np.zeros(len(acidentes))
+        for i, (gravidade, (_, peso)) in enumerate(PESOS_GRAVIDADE.items()):
+            self._gravidade[gravidades == gravidade] = i
+            self._peso[gravidades == gravidade] = peso
+        self.index = GridIndex.from_points(self._lon, self._lat)
+
+    def _perto(self, coords, buffer_m):
+        # Ids dos acidentes a até buffer_m metros da geometria
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        dlon, dlat = buffer_m / METROS_LON, buffer_m / METROS_LAT
+        candidatos = self.index.query_bbox(coords[:, 0].min() - dlon, coords[:, 1].min() - dlat,
+                                           coords[:, 0].max() + dlon, coords[:, 1].max() + dlat)
+        px, py = self._x[candidatos, None], self._y[candidatos, None]
+        ax, ay = _metros(coords[:, 0], coords[:, 1])
+        if len(coords) == 1:
+            d2 = (px[:, 0] - ax[0]) ** 2 + (py[:, 0] - ay[0]) ** 2
+        else:
+            # Distância ponto-segmento, candidatos x segmentos
+            bx, by = ax[1:], ay[1:]
+            ax, ay = ax[:-1], ay[:-1]
+            vx, vy = bx - ax, by - ay
+            comprimento = np.maximum(vx * vx + vy * vy, 1e-12)
+            t = np.clip(((px - ax) * vx + (py - ay) * vy) / comprimento, 0, 1)
+            d2 = ((px - ax - t * vx) ** 2 + (py - ay - t * vy) ** 2).min(axis=1)
+        return candidatos[d2 <= buffer_m * buffer_m]
+
+    def _na_janela(self, ids, dt_inicio, hr_inicio, dt_fim_prev, hr_fim_prev, faixa_horas):
+        # Mesmos dias da semana do período e mesma faixa de horário (diária)
+        inicio = _data(dt_inicio)
+        fim = _data(dt_fim_prev) or inicio
+        if inicio is not None:
+            dias = min((fim - inicio).days + 1, 7) if fim >= inicio else 1
+            datas = np.array([np.datetime64(inicio + datetime.timedelta(days=d), 'ns') for d in range(dias)])
+            ids = ids[np.isin(self._dia[ids], tempo.dia_semana(datas))]
+
+        comeco = _minutos(hr_inicio)
+        if comeco is not None:
+            termino = _minutos(hr_fim_prev)
+            termino = comeco if termino is None else termino
+            faixa = int(faixa_horas * 60)
+            comeco, duracao = (comeco - faixa) % 1440, (termino - comeco) % 1440 + 2 * faixa
+            if duracao < 1440:
+                ids = ids[(self._minuto[ids] - comeco) % 1440 <= duracao]
+        return ids
+
+    def score(self, geom_tipo: str | None, coords: npt.ArrayLike, dt_inicio: tempo.Data | None = None,
+              hr_inicio: str | datetime.time | None = None, dt_fim_prev: tempo.Data | None = None,
+              hr_fim_prev: str | datetime.time | None = None, buffer_m: float = 100,
+              faixa_horas: float = 1) -> dict[str, float]:
+        # Contagem total, por gravidade e ponderada (UPS) de uma geometria
+        if geom_tipo not in ('Point', 'LineString') or not len(coords):
+            ids = np.empty(0, dtype=np.int64)
+        else:
+            ids = self._perto(coords, buffer_m)
+            ids = self._na_janela(ids, dt_inicio, hr_inicio, dt_fim_prev, hr_fim_prev, faixa_horas)
+
+        resultado = {'acidentes': len(ids)}
+        contagem = np.bincount(self._gravidade[ids][self._gravidade[ids] >= 0], minlength=len(PESOS_GRAVIDADE))
+        for (coluna, _), total in zip(PESOS_GRAVIDADE.values(), contagem):
+            resultado[coluna] = int(total)
+        resultado['ponderado'] = float(self._peso[ids].sum())
+        return resultado
+
+    def score_local(self, local: str | None, **kwargs) -> dict[str, float]:
+        # Mesmo que score, a partir do GeoJSON do formulário
+        geometria = parse_local(local)
+        if geometria is None:
+            return self.score(None, [], **kwargs)
+        return self.score(geometria['type'], geometria['coordinates'], **kwargs)
+
+    def score_operacoes(self, operacoes: pd.DataFrame, buffer_m: float = 100,
+                        faixa_horas: float = 1) -> pd.DataFrame:
+        # Uma linha de resultado por operação; cada operação fica no cache pelo
+        # id (operações não mudam depois de gravadas) e pela versão dos acidentes
+        linhas = []
+        for op in operacoes[['id', 'geom_tipo', 'coords', 'dt_inicio', 'hr_inicio',
+                             'dt_fim_prev', 'hr_fim_prev']].itertuples(index=False):
+            key = ('risco', self.version, op.id, buffer_m, faixa_horas)
+            resultado = self.cache.get(key) if self.cache is not None else None
+            if resultado is None:
+                resultado = self.score(op.geom_tipo, op.coords, op.dt_inicio, op.hr_inicio,
+                                       op.dt_fim_prev, op.hr_fim_prev, buffer_m, faixa_horas)
+                if self.cache is not None:
+                    self.cache.put(key, resultado)
+            linhas.append(resultado)
+        return pd.DataFrame(linhas, index=operacoes.index)
@@ -0,0 +1,101 @@
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from cpmu import acidentes
+from cpmu.cache import LRUCache
+from cpmu.cubo import AccidentCube
+from cpmu.exportacao import ExportService
+from cpmu.filtros import FilterIndex, OptionCatalog
+from cpmu.hotspots import HotspotEngine
+from cpmu.metricas import MetricsRegistry
+from cpmu.proximidade import ProximityJoin
+from cpmu.repositorio import IncrementalOperacoes, OperacoesRepository
+
+# Dados compartilhados por todas as páginas e sessões do processo. Cada
+# recurso é montado uma única vez (st.cache_resource não copia o valor) e as
+# sessões recebem visões rasas do mesmo DataFrame: colunas novas ficam só na
+# visão, mas os valores são os do original e não podem ser alterados no lugar.
+
+@st.cache_resource
+def load_filter_cache() -> LRUCache:
+    # Resultados de filtros, hexágonos e riscos compartilhados entre sessões
+    return LRUCache(max_bytes=256 * 1024 * 1024)
+
+@st.cache_resource
+def _acidentes():
+    # Única cópia em memória do parquet de acidentes
+    return acidentes.read_acidentes()
+
+def load_acidentes() -> pd.DataFrame:
+    # Visão da cópia compartilhada (sem copiar os dados)
+    return _acidentes().copy(deep=False)
+
+@st.cache_resource
+def load_index() -> FilterIndex:
+    return FilterIndex(_acidentes(), version=acidentes.dataset_version(), cache=load_filter_cache())
+
+@st.cache_resource
+def load_catalog() -> OptionCatalog:
+    # Opções dos filtros, já calculadas para o estado inicial da página
+    catalogo = OptionCatalog(load_index())
+    fim = load_index().datas.bounds()[1].normalize()
+    catalogo.warm([((pd.Timestamp(acidentes.INICIO_PADRAO), fim), 'data_hora')])
+    return catalogo
+
+@st.cache_resource
+def load_cube() -> AccidentCube:
+    return AccidentCube(_acidentes(), load_index(), cache=load_filter_cache())
+
+@st.cache_resource
+def load_hotspots(column: str) -> HotspotEngine:
+    # Pontos críticos por semana, lidos do disco e completados só com as
+    # linhas novas; regrava quando algo mudou
+    engine = HotspotEngine.load(column)
+    if engine.update(_acidentes()):
+        engine.save()
+    return engine
+
+@st.cache_resource
+def load_proximidade() -> ProximityJoin | None:
+    # Histórico de acidentes indexado para o risco das operações
+    if not acidentes.available():
+        return None
+    return ProximityJoin(_acidentes(), version=acidentes.dataset_version(), cache=load_filter_cache())
+
+@st.cache_resource
+def load_operacoes() -> IncrementalOperacoes:
+    # Operações em memória, atualizadas só com as linhas novas
+    return IncrementalOperacoes(OperacoesRepository()).start_watcher()
+
+@st.cache_resource
+def load_exportacoes() -> ExportService:
+    # Pool de threads das exportações, compartilhado pelas sessões
+    return ExportService()
+
+@st.cache_resource
+def load_metrics() -> MetricsRegistry:
+    # Tempos e tamanhos dos reruns de todas as sessões (ver cpmu/metricas.py)
+    return MetricsRegistry()
+
+_aquecimento = None
+_trava = threading.Lock()
+
+def _aquecer():
+    load_operacoes()
+    if acidentes.available():
+        load_catalog()
+        load_cube()
+        load_hotspots('interseccao')
+        load_hotspots('logradouro')
+        load_proximidade()
+
+def warm() -> None:
+    # A primeira sessão, em qualquer página, dispara a montagem de todos os
+    # recursos em segundo plano; as outras páginas já os encontram prontos
+    global _aquecimento
+    with _trava:
+        if _aquecimento is None:
+            _aquecimento = threading.Thread(target=_aquecer, name='cpmu-aquecimento', daemon=True)
+            _aquecimento.start()
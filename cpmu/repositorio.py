@@ -0,0 +1,219 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from cpmu.espacial import GridIndex
+from cpmu.operacoes import COLUNAS, CSV_PATH, build_features, parse_local, with_geometry
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = 'data/operacoes.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS operacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    tipo TEXT,
+    concessionaria TEXT,
+    responsavel TEXT,
+    ctt_responsavel REAL,
+    logradouro TEXT,
+    numero REAL,
+    cruzamento TEXT,
+    dt_inicio TEXT,
+    hr_inicio TEXT,
+    dt_fim_prev TEXT,
+    hr_fim_prev TEXT,
+    dt_fim TEXT,
+    hr_fim TEXT,
+    descricao TEXT,
+    local TEXT NOT NULL,
+    geom_tipo TEXT,
+    min_lon REAL,
+    min_lat REAL,
+    max_lon REAL,
+    max_lat REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (chave, valor) VALUES ('versao', 0);
+'''
+
+# Colunas gravadas a cada inserção: as do formulário mais o tipo e a caixa
+# envolvente da geometria, calculados uma vez na gravação
+COLUNAS_TABELA = COLUNAS + ['geom_tipo', 'min_lon', 'min_lat', 'max_lon', 'max_lat']
+
+def _texto(valor):
+    # Datas e horas do formulário gravadas como texto ISO, igual ao CSV
+    if valor is None or isinstance(valor, (str, int, float)):
+        return valor
+    return str(valor)
+
+def _linha(dados):
+    linha = {c: _texto(dados.get(c)) for c in COLUNAS}
+    geometria = parse_local(linha['local'])
+    linha['geom_tipo'] = geometria['type'] if geometria else None
+    caixa = [None] * 4
+    if geometria:
+        pontos = geometria['coordinates']
+        pontos = [pontos] if geometria['type'] == 'Point' else pontos
+        lons = [p[0] for p in pontos]
+        lats = [p[1] for p in pontos]
+        caixa = [min(lons), min(lats), max(lons), max(lats)]
+    linha.update(zip(['min_lon', 'min_lat', 'max_lon', 'max_lat'], caixa))
+    return [linha[c] for c in COLUNAS_TABELA]
+
+class OperacoesRepository:
+    # Operações guardadas em SQLite (modo WAL), compartilhado pelas páginas de
+    # inserção e de mapa. Cada inserção é atômica e incrementa a versão dos
+    # dados na mesma transação.
+
+    def __init__(self, db_path: str = DB_PATH, csv_path: str = CSV_PATH):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            self._import_csv(conn, csv_path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _import_csv(self, conn, csv_path):
+        # Banco novo: traz as operações que estavam no CSV, uma única vez
+        if not os.path.exists(csv_path):
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT COUNT(*) FROM operacoes').fetchone()[0] == 0:
+                dados = pd.read_csv(csv_path, dtype=object, keep_default_na=False)
+                dados = dados.where(dados != '', None).to_dict('records')
+                self._insert(conn, dados)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _insert(self, conn, registros):
+        colunas = ', '.join(COLUNAS_TABELA)
+        marcadores = ', '.join('?' * len(COLUNAS_TABELA))
+        conn.executemany(f'INSERT INTO operacoes ({colunas}) VALUES ({marcadores})',
+                         [_linha(r) for r in registros])
+        conn.execute("UPDATE meta SET valor = valor + 1 WHERE chave = 'versao'")
+
+    def insert(self, dados: dict) -> tuple[int, int]:
+        # Grava uma operação; devolve o id dela e a nova versão dos dados
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._insert(conn, [dados])
+                novo_id = conn.execute('SELECT MAX(id) FROM operacoes').fetchone()[0]
+                versao = conn.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return novo_id, versao
+
+    def version(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()[0]
+
+    def read(self, after_id: int = 0) -> pd.DataFrame:
+        # Operações com id maior que after_id, em ordem de inserção, já com
+        # as colunas de geometria
+        with closing(self._connect()) as conn:
+            dados = pd.read_sql_query(
+                f"SELECT id, {', '.join(COLUNAS)} FROM operacoes WHERE id > ? ORDER BY id",
+                conn, params=(after_id,))
+        return with_geometry(dados)
+
+class IncrementalOperacoes:
+    # Cópia em memória das operações, compartilhada pelo processo. Guarda o
+    # último id lido e, a cada mudança, lê e converte só as linhas novas. O
+    # DataFrame e a lista de Features são copiados (cópia simples, O(n)) para
+    # os snapshots já entregues não mudarem; o índice espacial só acrescenta
+    # as células das caixas novas (GridIndex.extend). Um observador em
+    # segundo plano confere o arquivo do banco (e o -wal) e pega inserções
+    # feitas por outras sessões ou processos.
+
+    def __init__(self, repository: OperacoesRepository, interval: float = 0.5):
+        self.repository = repository
+        self.interval = interval
+        self.version = None
+        self.last_id = 0
+        self.df = None
+        self.features = []
+        self.index = None
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._watcher = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        # Junta as operações novas; devolve True quando a versão mudou
+        with self._lock:
+            versao = self.repository.version()
+            if versao == self.version:
+                return False
+            novas = self.repository.read(after_id=self.last_id)
+            if self.df is None:
+                self.df = novas
+            elif len(novas):
+                self.df = pd.concat([self.df, novas], ignore_index=True)
+            # Listas novas a cada mudança (as sessões guardam as anteriores);
+            # o índice espacial só calcula as células das caixas novas
+            if self.index is None:
+                self.features = build_features(self.df)
+                self.index = GridIndex(self.df['min_lon'], self.df['min_lat'],
+                                       self.df['max_lon'], self.df['max_lat'])
+            elif len(novas):
+                self.features = self.features + build_features(novas)
+                self.index = self.index.extend(novas['min_lon'], novas['min_lat'],
+                                               novas['max_lon'], novas['max_lat'])
+            if len(novas):
+                self.last_id = int(novas['id'].max())
+            self.version = versao
+            return True
+
+    def snapshot(self) -> tuple[int, pd.DataFrame, list[dict | None], GridIndex]:
+        # Versão, DataFrame, Features e índice do mesmo momento
+        with self._lock:
+            return self.version, self.df, self.features, self.index
+    def _signature(self):
+        assinatura = []
+        for caminho in (self.repository.db_path, self.repository.db_path + '-wal'):
+            try:
+                stat = os.stat(caminho)
+                assinatura.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                assinatura.append(None)
+        return tuple(assinatura)
+
+    def _watch(self):
+        # Um erro (banco ocupado além do timeout, linha com local inválido)
+        # não pode parar o observador: registra e tenta de novo na próxima volta
+        while True:
+            try:
+                assinatura = self._signature()
+                if assinatura != self._assinatura:
+                    self.refresh()
+                    self._assinatura = assinatura
+            except Exception:
+                logger.exception('Falha ao atualizar as operações; tentando de novo')
+            time.sleep(self.interval)
+
+    def start_watcher(self) -> 'IncrementalOperacoes':
+        # Observador único por processo (thread daemon)
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='operacoes-watcher', daemon=True)
+            self._watcher.start()
+        return self
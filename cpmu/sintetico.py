@@ -0,0 +1,112 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Gerador de acidentes sintéticos com o mesmo esquema do acidentes.csv, para
+# medir o desempenho sem os dados reais. Os valores seguem, por alto, o
+# formato dos dados de Santos: ruas com popularidade bem desigual, muitos
+# acidentes repetidos no mesmo endereço e menos registros a partir de 2018.
+
+# Ilha de Santos (lat, lon)
+CAIXA = (-23.995, -46.395, -23.930, -46.295)
+
+AVENIDAS = ['AV ANA COSTA', 'AV CONSELHEIRO NEBIAS', 'AV BARTOLOMEU DE GUSMAO',
+            'AV PRESIDENTE WILSON', 'AV SENADOR PINHEIRO MACHADO', 'AV AFONSO PENA',
+            'AV DOUTOR BERNARDINO DE CAMPOS', 'AV CAMPOS SALES', 'AV GENERAL FRANCISCO GLICERIO',
+            'AV PEDRO LESSA', 'AV SAO FRANCISCO', 'AV ALMIRANTE COCHRANE',
+            'AV VISCONDE DE SAO LEOPOLDO', 'AV JOAO PESSOA', 'RUA XV DE NOVEMBRO',
+            'AV SIQUEIRA CAMPOS', 'AV CONSELHEIRO RODRIGUES ALVES', 'AV EPITACIO PESSOA']
+
+GRAVIDADES = ['S/ LESÃO', 'C/ VÍTIMAS LEVES', 'C/ VÍTIMAS GRAVES', 'C/ VÍTIMAS FATAIS']
+P_GRAVIDADES = [0.45, 0.47, 0.07, 0.01]
+
+TIPOS = ['COLISÃO', 'ABALROAMENTO', 'CHOQUE', 'ATROPELAMENTO', 'QUEDA', 'CAPOTAMENTO']
+P_TIPOS = [0.40, 0.25, 0.12, 0.10, 0.10, 0.03]
+
+TEMPOS = ['BOM', 'NUBLADO', 'CHUVA']
+P_TEMPOS = [0.70, 0.18, 0.12]
+
+# Peso de cada ano de 2015 a 2024
+P_ANOS = np.array([10, 11, 10, 4, 3, 3, 2, 3, 3, 3], dtype=float)
+
+# Perfil do dia, por hora, com picos de manhã e no fim da tarde
+P_HORAS = np.array([2, 1.5, 1, 1, 1, 2, 4, 7, 8, 6, 5, 5, 6, 6, 5, 6, 7, 9, 9, 7, 5, 4, 3, 2.5])
+
+def streets(n_ruas=1500, seed=0):
+    # Ruas sintéticas: nome, segmento (início e direção) e peso de popularidade
+    rng = np.random.default_rng(seed)
+    nomes = AVENIDAS + [f'RUA {i}' for i in range(n_ruas - len(AVENIDAS))]
+    lat0, lon0, lat1, lon1 = CAIXA
+    angulo = rng.uniform(0, np.pi, len(nomes))
+    comprimento = rng.uniform(0.003, 0.03, len(nomes))
+    return pd.DataFrame({
+        'nome': nomes,
+        'lat': rng.uniform(lat0, lat1, len(nomes)),
+        'lon': rng.uniform(lon0, lon1, len(nomes)),
+        'dlat': np.sin(angulo) * comprimento,
+        'dlon': np.cos(angulo) * comprimento,
+        'peso': 1 / np.arange(1, len(nomes) + 1) ** 1.1,
+    })
+
+def addresses(ruas, n_enderecos, seed=0):
+    # Endereços fixos (rua, número ou cruzamento, ponto), onde os acidentes se repetem
+    rng = np.random.default_rng(seed + 1)
+    rua = rng.choice(len(ruas), n_enderecos, p=(ruas['peso'] / ruas['peso'].sum()).to_numpy())
+    posicao = rng.uniform(0, 1, n_enderecos)
+    numero = np.round(posicao * 3000).astype(float)
+
+    # Cerca de 40% dos endereços são cruzamentos, com ruas também populares
+    cruza = rng.uniform(0, 1, n_enderecos) < 0.4
+    outra = rng.choice(len(ruas), n_enderecos, p=(ruas['peso'] / ruas['peso'].sum()).to_numpy())
+    cruza &= outra != rua
+    numero[cruza] = np.nan
+    cruzamento = np.where(cruza, ruas['nome'].to_numpy()[outra], None)
+
+    lat = ruas['lat'].to_numpy()[rua] + posicao * ruas['dlat'].to_numpy()[rua]
+    lon = ruas['lon'].to_numpy()[rua] + posicao * ruas['dlon'].to_numpy()[rua]
+    return pd.DataFrame({
+        'lat': lat.round(6),
+        'lng': lon.round(6),
+        'logradouro': ruas['nome'].to_numpy()[rua],
+        'numero': numero,
+        'cruzamento': cruzamento,
+    })
+
+def generate(linhas, seed=0, enderecos=None):
+    # DataFrame com `linhas` acidentes no esquema do CSV original
+    rng = np.random.default_rng(seed + 2)
+    if enderecos is None:
+        enderecos = addresses(streets(seed=seed), max(linhas // 8, 1), seed)
+    pesos = np.random.default_rng(len(enderecos)).pareto(1.5, len(enderecos)) + 1
+
+    dados = enderecos.iloc[rng.choice(len(enderecos), linhas, p=pesos / pesos.sum())].reset_index(drop=True)
+
+    ano = rng.choice(np.arange(2015, 2025), linhas, p=P_ANOS / P_ANOS.sum())
+    dia = (ano - 1970).astype('datetime64[Y]').astype('datetime64[D]').astype(np.int64)
+    dia = dia + rng.integers(0, 365, linhas)
+    hora = rng.choice(24, linhas, p=P_HORAS / P_HORAS.sum())
+    minuto = rng.integers(0, 60, linhas)
+
+    dados.insert(0, 'data', pd.to_datetime(dia, unit='D').strftime('%Y-%m-%d'))
+    dados.insert(1, 'hora', pd.Series(hora).map('{:02d}'.format) + ':' + pd.Series(minuto).map('{:02d}:00'.format))
+    dados['gravidade'] = rng.choice(GRAVIDADES, linhas, p=P_GRAVIDADES)
+    dados['tipo_acidente'] = rng.choice(TIPOS, linhas, p=P_TIPOS)
+    dados['tempo'] = rng.choice(TEMPOS, linhas, p=P_TEMPOS)
+    return dados
+
+def write_csv(path, linhas, seed=0, chunk=1_000_000):
+    # Grava em blocos, para 10M de linhas não precisarem caber de uma vez; os
+    # endereços são os mesmos em todos os blocos
+    enderecos = addresses(streets(seed=seed), max(linhas // 8, 1), seed)
+    for i, inicio in enumerate(range(0, linhas, chunk)):
+        bloco = generate(min(chunk, linhas - inicio), seed=seed + i, enderecos=enderecos)
+        bloco.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera um acidentes.csv sintético')
+    parser.add_argument('linhas', type=int)
+    parser.add_argument('saida')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_csv(args.saida, args.linhas, args.seed)
@@ -0,0 +1,62 @@
+import math
+from collections.abc import Hashable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cpmu.cache import LRUCache
+
+# Tabelas paginadas no servidor: a ordenação e a página são escolhidas em
+# widgets, e só as linhas da página, com as colunas mostradas, vão para o
+# navegador.
+
+POR_PAGINA = 50
+
+def sort_order(df: pd.DataFrame, coluna: str | None = None, crescente: bool = True) -> np.ndarray:
+    # Posições das linhas de df na ordem pedida, com os vazios no fim. Coluna
+    # já ordenada (data_hora nos acidentes, que vêm ordenados do parquet) não
+    # é ordenada de novo; categóricas ordenam pelos códigos.
+    n = len(df)
+    if coluna is None:
+        return np.arange(n)
+    serie = df[coluna]
+    if serie.is_monotonic_increasing and not serie.hasnans:
+        ordem = np.arange(n)
+        return ordem if crescente else ordem[::-1]
+    serie = pd.Series(serie.to_numpy(), dtype=serie.dtype)
+    return serie.sort_values(ascending=crescente, kind='stable', na_position='last').index.to_numpy()
+
+def paged_table(df: pd.DataFrame, columns: list[str], key: str, total: int | None = None,
+                cache: LRUCache | None = None, cache_key: Hashable | None = None,
+                por_pagina: int = POR_PAGINA) -> pd.DataFrame:
+    # Mostra uma página de df e devolve o DataFrame enviado. `total` é a
+    # contagem exibida (por exemplo, vinda do índice de filtros); as ordens
+    # calculadas ficam no cache quando há uma chave para elas.
+    n = len(df)
+    paginas = max(1, math.ceil(n / por_pagina))
+    # A página fica só no session_state (sem value= no widget); volta à
+    # primeira quando os filtros deixam menos páginas
+    if st.session_state.get(f'{key}_pagina', 1) > paginas:
+        st.session_state[f'{key}_pagina'] = 1
+
+    controles = st.columns([2, 1, 1], vertical_alignment='bottom')
+    coluna = controles[0].selectbox('Ordenar por', [None] + list(columns), key=f'{key}_coluna',
+                                    format_func=lambda c: 'Ordem original' if c is None else c)
+    crescente = controles[1].toggle('Crescente', value=True, key=f'{key}_crescente')
+    pagina = controles[2].number_input(f'Página (de {paginas})', min_value=1, max_value=paginas,
+                                       key=f'{key}_pagina')
+
+    chave = None if cache is None or cache_key is None else ('ordem', cache_key, coluna, crescente)
+    ordem = cache.get(chave) if chave is not None else None
+    if ordem is None:
+        ordem = sort_order(df, coluna, crescente)
+        if chave is not None:
+            cache.put(chave, ordem)
+
+    inicio = (pagina - 1) * por_pagina
+    visiveis = df.take(ordem[inicio:inicio + por_pagina])[list(columns)]
+    st.dataframe(visiveis, hide_index=True)
+    st.caption(f'Linhas {min(inicio + 1, n)} a {min(inicio + por_pagina, n)} de '
+               f'{n if total is None else total}')
+    return visiveis
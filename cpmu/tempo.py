@@ -0,0 +1,68 @@
+import datetime
+
+import numpy as np
+import numpy.typing as npt
+
+# Agrupamentos de tempo feitos com aritmética inteira sobre os timestamps em
+# int64 (nanossegundos desde 1970-01-01, que foi uma quinta-feira).
+NS_MINUTO = 60 * 1_000_000_000
+NS_MEIA_HORA = 30 * NS_MINUTO
+NS_DIA = 24 * 60 * NS_MINUTO
+MEIAS_HORAS = 48
+
+# Data aceita nos períodos (pd.Timestamp é um datetime)
+Data = str | datetime.date | np.datetime64
+
+def as_int64(datas: npt.ArrayLike) -> np.ndarray:
+    # Timestamps como int64 em ns, sem cópia quando já são datetime64[ns]
+    datas = np.asarray(datas)
+    if datas.dtype.kind == 'M':
+        datas = datas.astype('datetime64[ns]', copy=False)
+    return datas.view(np.int64)
+
+def _pesos(weights):
+    return None if weights is None else np.asarray(weights, dtype=np.float64)
+
+def _inteiros(counts):
+    return np.rint(counts).astype(np.int64)
+
+def dia_semana(datas: npt.ArrayLike) -> np.ndarray:
+    # 1, domingo até 7, sábado
+    dias = as_int64(datas) // NS_DIA
+    return ((dias + 4) % 7 + 1).astype(np.int8)
+
+def half_hour_counts(datas: npt.ArrayLike,
+                     weights: npt.ArrayLike | None = None) -> tuple[np.ndarray, np.ndarray]:
+    # Contagem por meia hora do dia; só as meias horas com acidentes,
+    # rotuladas como 'HH:MM:SS'
+    ts = as_int64(datas)
+    counts = _inteiros(np.bincount((ts // NS_MEIA_HORA) % MEIAS_HORAS,
+                                   weights=_pesos(weights), minlength=MEIAS_HORAS))
+    slots = np.flatnonzero(counts)
+    labels = np.array([f'{s // 2:02d}:{30 * (s % 2):02d}:00' for s in slots], dtype=object)
+    return labels, counts[slots]
+
+def weekly_counts(datas: npt.ArrayLike,
+                  weights: npt.ArrayLike | None = None) -> tuple[np.ndarray, np.ndarray]:
+    # Contagem por semana (começando na segunda-feira, como o período 'W' do
+    # pandas); só as semanas com acidentes
+    ts = as_int64(datas)
+    dias = ts // NS_DIA
+    semanas = dias - (dias + 3) % 7
+    semanas, posicao = np.unique(semanas, return_inverse=True)
+    counts = _inteiros(np.bincount(posicao.ravel(), weights=_pesos(weights), minlength=len(semanas)))
+    return (semanas * NS_DIA).astype('datetime64[ns]'), counts
+
+def monthly_counts(datas: npt.ArrayLike,
+                   weights: npt.ArrayLike | None = None) -> tuple[np.ndarray, np.ndarray]:
+    # Contagem por mês, do primeiro ao último, incluindo meses vazios no meio;
+    # rotulada pelo último dia do mês, como o Grouper(freq='M') do pandas
+    ts = as_int64(datas)
+    if not len(ts):
+        return np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=np.int64)
+    meses = (ts // NS_DIA).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    primeiro = meses.min()
+    counts = _inteiros(np.bincount(meses - primeiro, weights=_pesos(weights)))
+    labels = np.arange(primeiro, primeiro + len(counts)) + 1
+    labels = labels.astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    return labels.astype('datetime64[ns]'), counts
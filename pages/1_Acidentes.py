@@ -1,56 +1,48 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import pydeck as pdk
-import numpy as np
-from datetime import date
+from cpmu.exportacao import FORMATOS, MIMES, export_key
+from cpmu.figuras import (AGRUPAMENTOS, cluster_map, cluster_rows, heat_deck, locate_ids, point_clusters,
+                          scatter_map, selected_ids)
+from cpmu.filtros import normalize_filters
+from cpmu.graficos import aggregations, charts
+from cpmu.hexagonos import column_data, hex_bins
+from cpmu.acidentes import INICIO_PADRAO
+from cpmu.metricas import RerunProfile
+from cpmu.recursos import (load_acidentes, load_catalog, load_cube, load_exportacoes, load_filter_cache,
+                            load_hotspots, load_index, load_metrics, warm)
+from cpmu.tabelas import paged_table
 st.set_page_config(page_title="Acidentes", page_icon="🚗", layout='wide',initial_sidebar_state="collapsed")
 st.title("Dados de Acidentes")
 
-@st.cache_data
-def load_data():
-    dados = pd.read_csv("data/acidentes.csv")
-
-    dados.sort_values(by=['data', 'hora'], inplace=True)
-    dados.reset_index(drop=True, inplace=True)
-    dados['data'] = pd.to_datetime(dados['data'])
-    dados['data'] = pd.to_datetime(dados['data'].astype(str) + ' ' + dados['hora'])
-    dados.drop(columns='hora', inplace=True)
-    dados['dia_semana'] = (dados['data'].dt.dayofweek)
-    dias = {0: 2, 1: 3, 2: 4, 3: 5, 4: 6, 5: 7, 6: 1}
-    dados['dia_semana'] = dados['dia_semana'].map(dias)
-    dados.rename(columns={'lng':'lon','data':'data_hora'}, inplace=True)
-    return dados
-
-@st.cache_data
+# Tempos de cada etapa do rerun (sempre) e tamanho dos gráficos (com o painel aberto)
+debug = st.sidebar.toggle('Painel de desempenho')
+perfil = RerunProfile('acidentes', payloads=debug)
+
 def apply_filters(df, filters):
-    for filter_value, column in filters:
-        if filter_value: 
-            if column == 'data_hora': 
-                start, finish = filter_value
-                df = df[(df['data_hora'] >= start) & (df['data_hora'] <= finish)]
-            elif isinstance(filter_value, list):  # Para mais de um valor (multiselect)
-                df = df[df[column].isin(filter_value)]
-            else:  # Para só um valor (selectbox)
-                df = df[df[column] == filter_value]
-    
-    return df
+    # Só o período é uma fatia das linhas, sem cópia (ver cpmu/filtros.py)
+    return load_index().take(df, filters)
 
-# Carrega os dados
-df = load_data()
+# Carrega os dados (compartilhados pelo processo, ver cpmu/recursos.py)
+with perfil.span('carregar'):
+    warm()
+    df = load_acidentes()
+    index = load_index()
+    catalogo = load_catalog()
 
 with st.expander('Sobre'):
     st.markdown('''
             Dados de acidentes em Santos de 2015 a 2024. A partir de 2018 a quantidade de dados 
             anuais cai drasticamente, por isso o ano inicial padrão é 2018. 
 
-            Muitos acidentes aconteceram no mesmo endereço/cruzamento, por isso os pontos ficam 
-            sobrepostos no mapa. Recomendo usar (clicar) a legenda do próprio gráfico para ocultar 
-            alguns pontos e ver quais estão acima de quais, ou usar o seletor do mapa.
+            Muitos acidentes aconteceram no mesmo endereço/cruzamento. Por padrão o mapa de pontos 
+            junta os acidentes do mesmo local num só marcador, maior quanto mais acidentes, com a cor 
+            da gravidade mais frequente; o hover mostra a quantidade de cada gravidade. Também dá para 
+            agrupar numa grade de 50 m ou 200 m (aí o hover mostra só as contagens, sem endereço), 
+            ou voltar a um ponto por acidente.
 
-            A ordem das ruas no cruzamento importa. Rua A x B vai mostrar resultados diferentes de 
-            rua B x A.
+            A ordem das ruas no cruzamento não importa: Rua A x B e rua B x A são o mesmo cruzamento, 
+            tanto no filtro quanto no gráfico de cruzamentos. Com um cruzamento escolhido, o filtro 
+            de logradouro serve só para encontrar os cruzamentos daquelas ruas.
 
             A legenda do mapa oculta os pontos apenas visualmente, ou seja, eles ainda aparecerão
             na tabela de dados. Para evitar isso, selecione a gravidade desejada no filtro de gravidade. 
@@ -59,21 +51,27 @@ with st.expander('Sobre'):
             anteriores.
 
             Os dias da semana estão representados em números, de 1, domingo até 7, sábado.
+
+            Os pontos críticos (aba Gráficos) usam só o período escolhido, arredondado para 
+            semanas inteiras (segunda a domingo). A tendência é a inclinação da reta das UPS 
+            semanais nas últimas 13 semanas do período: positiva quando o local está piorando.
+
+            Em Exportar dados (no fim da página) dá para baixar os acidentes filtrados, ou só os 
+            selecionados no mapa de pontos, em CSV, Parquet ou GeoJSON, e as tabelas dos gráficos.
                 ''')
 
 # Filtros
-with st.container():
+with st.container(), perfil.span('filtros'):
     st.header('Filtros')
     
-    min_date = df['data_hora'].min().date()
-    max_date = df['data_hora'].max().date()
+    min_date, max_date = (data.date() for data in index.datas.bounds())
 
     linhaPeriodo = st.columns([1,1])
     # Filtro de data inicial
     start_date = linhaPeriodo[0].date_input(
         "Escolha a data inicial",
         format="DD/MM/YYYY",
-        value=date(2018,1,1),
+        value=INICIO_PADRAO,
         min_value=min_date,
         max_value=max_date
     )
@@ -91,7 +89,6 @@ with st.container():
     start_date = pd.to_datetime(start_date)
     end_date = pd.to_datetime(end_date)
     filters.append(((start_date, end_date), 'data_hora'))
-    df = apply_filters(df, filters)
 
     #filters.append((ano, 'data_hora'.dt.year))
 
@@ -100,278 +97,269 @@ with st.container():
     with colGrav:
         selected_gravidade = st.multiselect(
             label='Gravidade(s)',
-            options=df['gravidade'].unique(),
+            options=catalogo.options('gravidade', filters),
             placeholder='Escolha a(s) gravidade(s)'
         )
         filters.append((selected_gravidade, 'gravidade'))
-        df = apply_filters(df, filters)
 
     with colTipo:
         selected_tipo = st.multiselect(
             label='Tipo(s) de acidente',
-            options=df['tipo_acidente'].unique(),
+            options=catalogo.options('tipo_acidente', filters),
             placeholder='Escolha o(s) tipo(s) de acidente'
         )
         filters.append((selected_tipo, 'tipo_acidente'))
-        df = apply_filters(df, filters)
 
     with colTempo:
         selected_tempo = st.multiselect(
             label='Tempo(s)',
-            options=df['tempo'].unique(),
+            options=catalogo.options('tempo', filters),
             placeholder='Escolha o(s) tempo(s)'
         )
         filters.append((selected_tempo, 'tempo'))
-        df = apply_filters(df, filters)
 
     linha2 = st.columns([2,1,2])
 
     selected_logras = linha2[0].multiselect(
         label='Logradouro',
-        options=df['logradouro'].unique(),
+        options=catalogo.options('logradouro', filters),
         placeholder='Escolha o(s) Logradouro(s)'
         )
     filters.append((selected_logras, 'logradouro'))
-    df = apply_filters(df, filters)
 
     selected_nums = linha2[1].multiselect(
         label='Número',
-        options=df['numero'].unique(),
+        options=catalogo.options('numero', filters),
         placeholder='Escolha um nº'
     )
     filters.append((selected_nums, 'numero'))
-    df = apply_filters(df, filters)
 
+    # Cruzamentos sem ordem das ruas: 'A x B' inclui os registrados como B x A,
+    # por isso o filtro de logradouro não corta as opções nem as linhas
+    filtros_cruz = [f for f in filters if f[1] != 'logradouro']
     selected_cruz = linha2[2].multiselect(
             label='Cruzamento',
-            options=df['cruzamento'].unique(),
+            options=catalogo.intersections(filtros_cruz, selected_logras),
             placeholder = 'Escolha o(s) cruzamento(s)'
             )
-    filters.append((selected_cruz, 'cruzamento'))
-    df = apply_filters(df, filters)
+    if selected_cruz:
+        filters = filtros_cruz
+    filters.append((selected_cruz, 'interseccao'))
 
-gravidade_colors = {
-    'C/ VÍTIMAS LEVES': 'green',
-    'C/ VÍTIMAS GRAVES': 'orange',
-    'C/ VÍTIMAS FATAIS': 'red',
-    'S/ LESÃO': 'blue'
-}
+with perfil.span('aplicar_filtros'):
+    df = apply_filters(df, filters)
 
 config = {'displayModeBar': True}
-fig = go.Figure()
 
-gravidades = df['gravidade'].unique()
-for gravidade in gravidades:
-    df_gravidades = df[df['gravidade'] == gravidade]
-    
-    hover_text = df_gravidades.apply(
-        lambda row: f"Logradouro: {row['logradouro']}<br>Número: {row['numero']}<br>Cruzamento: {row['cruzamento']}",
-        axis=1
-    )
+# Colunas das tabelas de dados (paginadas, ver cpmu/tabelas.py)
+COLUNAS_TABELA = ['data_hora','dia_semana','logradouro','numero',
+                  'cruzamento','tipo_acidente','gravidade','tempo']
 
-    fig.add_trace(go.Scattermapbox(
-        lat=df_gravidades.lat,
-        lon=df_gravidades.lon,
-        mode='markers',
-        marker=dict(
-            size=8,
-            opacity=0.7,
-            color=gravidade_colors.get(gravidade, 'gray')
-        ),
-        name=f'{gravidade}',
-        hovertext=hover_text, 
-        hoverinfo='text' 
-    ))
-
-fig.update_layout(
-    mapbox=dict(
-        style="open-street-map",
-        center=dict(lat=-23.959, lon=-46.342),
-        zoom=12
-    ),
-    height=450,
-    margin=dict(l=0, r=0, t=0, b=0),
-    legend=dict(
-        x=0.0,
-        y=0.925,
-        xanchor='left',
-        yanchor='middle',
-        font=dict(size=14),
-        orientation='v' 
-    ),
-    showlegend=True
-)
+# Cada aba é um fragmento: um widget dentro dela (seleção no mapa, tamanho do
+# hexágono) refaz só a própria aba. Os fragmentos medem os próprios reruns.
+def fragment_profile(nome):
+    return RerunProfile(f'acidentes.{nome}', payloads=debug)
 
-tabScatter, tabHeat, tabGraphs = st.tabs(['Mapa de Pontos', 'Mapa de Calor','Gráficos'])
+def finish_fragment(perfil_aba):
+    load_metrics().observe(perfil_aba)
+    st.session_state.setdefault('perfis_abas', {})[perfil_aba.pagina] = perfil_aba
+
+@st.fragment
+def aba_pontos(df, filters):
+    perfil_aba = fragment_profile('pontos')
+    agrupar = st.select_slider('Agrupar pontos', options=list(AGRUPAMENTOS), value='Mesmo local')
+    metros = AGRUPAMENTOS[agrupar]
+
+    with perfil_aba.span('figura_pontos'):
+        if metros is None:
+            fig = scatter_map(df, hover='template')
+        else:
+            # Um marcador por local (ou célula), guardado por filtro e tamanho
+            key = ('pontos', index.version, normalize_filters(filters), metros)
+            agrupados = load_filter_cache().get(key)
+            if agrupados is None:
+                agrupados = load_filter_cache().put(key, point_clusters(df, metros))
+            grupos, grupo = agrupados
+            fig = cluster_map(grupos, endereco=metros == 0)
+    perfil_aba.payload('mapa_pontos', fig)
 
-# Visualização
-with tabScatter:
     colMap, colDF = st.columns(2)
-    with colMap:
+    with colMap, perfil_aba.span('mapa_pontos'):
         st.write('Mapa de Acidentes por Gravidade')
         selected_points = st.plotly_chart(fig, use_container_width=True,
                         on_select='rerun',
                         selection_mode=['box','lasso'])
 
     if selected_points:
-        selected_coords = [(p['lon'], p['lat']) for p in selected_points.get('selection', {}).get('points', [])]
+        # O id de cada ponto é o índice da linha (df segue ordenado por ele)
+        # ou, agrupado, o número do grupo
+        selected = selected_ids(selected_points.get('selection', {}))
         
-        if selected_coords:
-            df_filtered = df[df[['lon', 'lat']].apply(tuple, axis=1).isin(selected_coords)]
+        if selected.size and metros is None:
+            df_filtered = df.take(locate_ids(df.index.to_numpy(), selected))
+        elif selected.size:
+            df_filtered = df.take(cluster_rows(grupo, selected))
         else:
-            df_filtered = pd.DataFrame() 
+            df_filtered = df.iloc[:0]
     else:
         df_filtered = df
 
-    with colDF:
+    # Seleção do mapa para a exportação, válida só com estes filtros
+    st.session_state['selecao_pontos'] = None if df_filtered is df or df_filtered.empty else (
+        normalize_filters(filters), df_filtered.index.to_numpy())
+
+    with colDF, perfil_aba.span('tabela_pontos'):
         st.write("Dados")
-        st.dataframe(df_filtered, hide_index=True,
-                        column_order=['data_hora','dia_semana','logradouro','numero',
-                                    'cruzamento','tipo_acidente','gravidade','tempo'])
+        # Sem seleção, a contagem e as ordens vêm do índice de filtros
+        if df_filtered is df:
+            tabela = paged_table(df, COLUNAS_TABELA, key='tabela_pontos', total=index.count(filters),
+                                 cache=load_filter_cache(), cache_key=(index.version, normalize_filters(filters)))
+        else:
+            tabela = paged_table(df_filtered, COLUNAS_TABELA, key='tabela_pontos')
         if df_filtered.empty:
-            st.write('Contagem: ', df.shape[0])
+            st.write('Contagem: ', index.count(filters))
         else:
-            st.write('Contagem: ', df_filtered.shape[0])
+            st.write('Contagem: ', len(df_filtered))
+    perfil_aba.payload('tabela_pontos', tabela)
+    finish_fragment(perfil_aba)
 
-with tabHeat:
+@st.fragment
+def aba_calor(df, filters):
+    perfil_aba = fragment_profile('calor')
     linha = st.columns([2,1])
     with linha[0]:        
-        chart = st.pydeck_chart(
-            pdk.Deck(
-                map_style='light',
-                initial_view_state=pdk.ViewState(
-                    latitude=-23.959,
-                    longitude=-46.342,
-                    zoom=11,
-                    pitch=50
-                ),
-                layers=[
-                    pdk.Layer(
-                        "HexagonLayer",
-                        data=df,
-                        get_position="[lon, lat]",
-                        radius=70,
-                        elevation_scale=2,
-                        auto_highlight=True,
-                        elevation_range=[0, 1000],
-                        upperPercentile=99,
-                        #lowerPercentile=1,
-                        pickable=True,
-                        extruded=True,
-                        material=True
-                    )
-                ],
-            )
-        )
-    with linha[1]:
+        opcoesHeat = st.columns([1,1])
+        raio = opcoesHeat[0].select_slider('Tamanho do hexágono (m)', options=[35, 70, 140, 280], value=70)
+        ponderado = opcoesHeat[1].toggle('Ponderar pela gravidade')
+
+        with perfil_aba.span('hexagonos'):
+            # Hexágonos calculados no servidor e guardados por filtro e tamanho
+            key = ('hex', index.version, normalize_filters(filters), raio)
+            cells = load_filter_cache().get(key)
+            if cells is None:
+                cells = load_filter_cache().put(key, hex_bins(df, radius=raio))
+            cells = column_data(cells, ponderado)
+
+        with perfil_aba.span('mapa_calor'):
+            deck = heat_deck(cells, raio)
+            st.pydeck_chart(deck)
+        perfil_aba.payload('mapa_calor', deck)
+    with linha[1], perfil_aba.span('tabela_calor'):
         st.write("Dados")
-        st.dataframe(df, hide_index=True,
-                        column_order=['data_hora','dia_semana','logradouro','numero',
-                                    'cruzamento','tipo_acidente','gravidade','tempo'])
-        st.write('Contagem: ', df.shape[0])
-
-with tabGraphs:
-    
-    linha1 = st.columns([2,1]) 
-    linha2 = st.columns([2,1]) 
-
-    dflogs = df['logradouro'].value_counts().head(10).reset_index()
-    dflogs.columns = ['Logradouro', 'Contagem']
-    dflogs = dflogs.sort_values(by='Contagem', ascending=False)
-
-    figlog = px.bar(dflogs, x='Contagem', y='Logradouro', orientation='h',
-            title="Logradouros com Mais Acidentes")
-
-    figlog.update_layout(
-        xaxis_title="Contagem de Acidentes",
-        yaxis_title="Logradouro",
-        yaxis_tickfont=dict(size=10)) 
-    graphLog = linha1[0].plotly_chart(figlog)
-
-    gravidade_counts = df['gravidade'].value_counts().reset_index()
-    gravidade_counts.columns = ['Gravidade', 'Contagem']
-
-    figgrav = px.pie(gravidade_counts,names='Gravidade',values='Contagem', title='Distribuição de Gravidade')
-
-    graphGrav = linha1[1].plotly_chart(figgrav)
-
-    df_crossings = df.dropna(subset=['cruzamento'])
-
-    df_crossings['logradouro_cruzamento'] = df_crossings['logradouro'] + ' x ' + df_crossings['cruzamento']
-    df_top_crossings = df_crossings['logradouro_cruzamento'].value_counts().head(10).reset_index()
-    df_top_crossings.columns = ['Cruzamento', 'Contagem']
-
-    figcruz = px.bar(df_top_crossings, x='Contagem', y='Cruzamento', 
-                orientation='h',
-                title="Cruzamentos com Mais Acidentes")
-
-    figcruz.update_layout(
-        xaxis_title="Contagem de Acidentes",
-        yaxis_title="Cruzamento",
-        yaxis_tickfont=dict(size=10) 
-    )
-
-    linha2[0].plotly_chart(figcruz)
-
-    tempo_counts = df['tempo'].value_counts().reset_index()
-    tempo_counts.columns = ['Tempo', 'Contagem']
-    figtempo = px.pie(tempo_counts,names='Tempo',values='Contagem', title='Condições Climáticas')
-
-    linha2[1].plotly_chart(figtempo)
-
-    df['hora'] = pd.to_datetime(df['data_hora']).dt.floor('30T').dt.time
-    hora_counts = df['hora'].value_counts().reset_index()
-    hora_counts.columns = ['Horário', 'Contagem']
-    hora_counts = hora_counts.sort_values(by='Horário')
-    hora_counts['Horário'] = hora_counts['Horário'].astype(str)
-
-    histogram_fig = px.histogram(hora_counts,
-                                 x='Horário',
-                                 y='Contagem',
-                                 title='Histograma de Contagem de Acidentes por Horário',
-                                 nbins=24
-                                )
-
-    histogram_fig.update_layout(
-        xaxis_title='Horário',
-        yaxis_title='Contagem',
-        xaxis_tickangle=-45,
-        showlegend=True
-    )
-    st.plotly_chart(histogram_fig, use_container_width=True)
-
-    linha3 = st.columns([1,1])
-    df['dia'] = pd.to_datetime(df['data_hora']).dt.date
-    df['data_hora'] = pd.to_datetime(df['data_hora'])
-
-    monthly_counts = df.groupby(pd.Grouper(key='data_hora', freq='M')).size().reset_index(name='Contagem')
-    monthly_counts['Mês'] = monthly_counts['data_hora'].astype(str)
-
-    area_fig = px.area(monthly_counts,
-                    x='Mês',
-                    y='Contagem',
-                    title='Contagem de Acidentes por Mês')
-
-    area_fig.update_layout(
-        xaxis_title='Mês',
-        yaxis_title='Contagem',
-        showlegend=True
-    )
-
-    linha3[0].plotly_chart(area_fig, use_container_width=True)
+        tabela = paged_table(df, COLUNAS_TABELA, key='tabela_calor', total=index.count(filters),
+                             cache=load_filter_cache(), cache_key=(index.version, normalize_filters(filters)))
+        st.write('Contagem: ', index.count(filters))
+    perfil_aba.payload('tabela_calor', tabela)
+    finish_fragment(perfil_aba)
+
+@st.fragment
+def aba_graficos(filters):
+    perfil_aba = fragment_profile('graficos')
+
+    # Todos os gráficos saem do cubo pré-agregado, sob os filtros atuais
+    with perfil_aba.span('agregacoes'):
+        tabelas = aggregations(load_cube(), filters)
+    with perfil_aba.span('figuras'):
+        figuras = charts(tabelas)
+
+    with perfil_aba.span('graficos'):
+        linha1 = st.columns([2,1]) 
+        linha2 = st.columns([2,1]) 
+        linha1[0].plotly_chart(figuras['logradouros'])
+        linha1[1].plotly_chart(figuras['gravidade'])
+        linha2[0].plotly_chart(figuras['cruzamentos'])
+        linha2[1].plotly_chart(figuras['tempo'])
+        st.plotly_chart(figuras['horarios'], use_container_width=True)
+
+        linha3 = st.columns([1,1])
+        linha3[0].plotly_chart(figuras['meses'], use_container_width=True)
+        linha3[1].plotly_chart(figuras['semanas'], use_container_width=True)
+
+    # Pontos críticos do período (semanas inteiras), com a tendência do
+    # último trimestre; só o período vale aqui, não os outros filtros
+    with perfil_aba.span('pontos_criticos'):
+        st.subheader('Pontos Críticos')
+        opcoesCriticos = st.columns([1,1,2])
+        dimensao = opcoesCriticos[0].radio('Local', ['Cruzamentos', 'Logradouros'], horizontal=True)
+        ordem = opcoesCriticos[1].radio('Ordenar por', ['UPS', 'Acidentes'], horizontal=True)
+        inicio, fim = filters[0][0]
+        ranking = load_hotspots('interseccao' if dimensao == 'Cruzamentos' else 'logradouro').ranking(
+            inicio, fim, by='ponderado' if ordem == 'UPS' else 'acidentes', top=20)
+        ranking.columns = ['Acidentes', 'UPS', 'Tendência (UPS/semana)']
+        st.dataframe(ranking.round(2), width='stretch')
+    perfil_aba.payload('pontos_criticos', ranking)
+    for nome, figura in figuras.items():
+        perfil_aba.payload(nome, figura)
+    finish_fragment(perfil_aba)
+
+@st.fragment
+def exportar(df, filters):
+    # O arquivo é gravado em segundo plano (ver cpmu/exportacao.py); pedidos
+    # iguais, desta ou de outra sessão, reaproveitam o mesmo arquivo
+    spec = normalize_filters(filters)
+    linhaExportar = st.columns([2,1], vertical_alignment='bottom')
+    formato = linhaExportar[0].selectbox('Formato', list(FORMATOS))
+    extensao = FORMATOS[formato]
+
+    selecao = st.session_state.get('selecao_pontos')
+    ids = None
+    if extensao != 'zip' and selecao is not None and selecao[0] == spec:
+        ids = selecao[1]
+        st.caption(f'Só os {len(ids)} acidentes selecionados no mapa de pontos')
+
+    chave = export_key(index.version, spec, extensao, ids)
+    exportacoes = load_exportacoes()
+    if linhaExportar[1].button('Preparar arquivo', width='stretch'):
+        if extensao == 'zip':
+            exportacoes.submit(chave, extensao, load_cube(), filters)
+        else:
+            linhas = df if ids is None else df.take(locate_ids(df.index.to_numpy(), ids))
+            exportacoes.submit(chave, extensao, linhas)
+
+    estado, valor = exportacoes.status(chave, extensao)
+    if estado == 'pronto':
+        nome = 'graficos' if extensao == 'zip' else 'acidentes'
+        # O arquivo só é lido quando o botão é clicado
+        st.download_button('Baixar', lambda: exportacoes.read(chave, extensao), file_name=f'{nome}.{extensao}',
+                           mime=MIMES[extensao], on_click='ignore')
+    elif estado == 'erro':
+        st.error(f'Não foi possível exportar: {valor}')
+    elif estado == 'andamento':
+        aguardar_exportacao(chave, extensao)
+
+@st.fragment(run_every=1)
+def aguardar_exportacao(chave, extensao):
+    # Confere a tarefa a cada segundo; pronta (ou com erro), refaz a página
+    # para mostrar o botão de download
+    if load_exportacoes().status(chave, extensao)[0] != 'andamento':
+        st.rerun()
+    st.write('Preparando o arquivo...')
 
-    df['Semana'] = df['data_hora'].dt.to_period('W').apply(lambda r: r.start_time)
-    weekly_counts = df.groupby('Semana').size().reset_index(name='Contagem')
+tabScatter, tabHeat, tabGraphs = st.tabs(['Mapa de Pontos', 'Mapa de Calor','Gráficos'])
 
-    area_fig = px.area(weekly_counts,
-                    x='Semana',
-                    y='Contagem',
-                    title='Contagem de Acidentes por Semana')
+# Visualização
+with tabScatter:
+    aba_pontos(df, filters)
 
-    area_fig.update_layout(
-        xaxis_title='Semana',
-        yaxis_title='Contagem',
-        showlegend=True
-    )
+with tabHeat:
+    aba_calor(df, filters)
 
-    linha3[1].plotly_chart(area_fig, use_container_width=True)
\ No newline at end of file
+with tabGraphs:
+    aba_graficos(filters)
+
+with st.expander('Exportar dados'):
+    exportar(df, filters)
+
+# Registro do rerun (ver cpmu/metricas.py) e painel de desempenho, com o
+# último rerun de cada aba
+load_metrics().observe(perfil, {'filtros': load_filter_cache().stats()})
+if debug:
+    perfis = [perfil] + list(st.session_state.get('perfis_abas', {}).values())
+    with st.sidebar:
+        st.write(f'Rerun: {perfil.total() * 1000:.0f} ms')
+        st.dataframe(pd.Series({f'{p.pagina}: {etapa}': segundos for p in perfis
+                                for etapa, segundos in p.spans.items()}, name='ms').mul(1000).round(1))
+        st.dataframe(pd.Series({f'{p.pagina}: {nome}': tamanho for p in perfis
+                                for nome, tamanho in p.payloads.items()}, name='bytes', dtype='int64'))
+        st.write('Cache de filtros')
+        st.json(load_filter_cache().stats())
@@ -1,78 +1,30 @@
 import streamlit as st
-import pandas as pd
-import folium
 from streamlit_folium import st_folium
-from folium.plugins import Draw
 import datetime
-import branca
-from folium.plugins import Geocoder
-import json
+from cpmu.mapas import draw_map
+from cpmu.operacoes import COLUNAS, dump_local, form_record
+from cpmu.recursos import load_operacoes, load_proximidade, warm
+from cpmu.tabelas import paged_table
 
 
 st.set_page_config(page_title="Mapa", page_icon="🌎", layout='wide',initial_sidebar_state="collapsed")
 st.title("Mapa de Operações")
 
-@st.cache_data
-def load_data():
-    dados = pd.read_csv('data/operacoes.csv')
-    return dados
-def add_dados(df, dados):
-    dados_mapeados = {
-        'nome': dados[0],
-        'tipo': dados[1],
-        'concessionaria': dados[2],
-        'responsavel': dados[3],
-        'ctt_responsavel': dados[4],
-        'logradouro': dados[5],
-        'numero': dados[6],  
-        'cruzamento': dados[7],
-        'dt_inicio': dados[8],  
-        'hr_inicio': dados[9], 
-        'dt_fim_prev': dados[10],
-        'hr_fim_prev': dados[11],
-        'dt_fim': None,
-        'hr_fim': None,
-        'descricao': dados[12],
-        'local' : dados[13]
-    }
-
-    tempdf = pd.DataFrame([dados_mapeados])    
-    tempdf.to_csv('data/operacoes.csv', mode='a', header=False, index=False)
-    df = pd.concat([df, tempdf], ignore_index=True)
-    # df['local'] = df['local'].apply(lambda x: x.replace('"', ''))
-    # df['local'] = df['local'].apply(lambda x: x.replace("'", '"'))   
-    # df['local'] = df['local'].apply(json.loads)
-    return df
-def convert_to_feature_collection(input_json):
-    data = json.loads(input_json)
-    feature_collection = {
-        "type": "FeatureCollection",
-        "features": [
-            data
-        ]
-    }
-    return json.dumps(feature_collection, indent=2)
-
-df = load_data()
+def add_dados(dados):
+    dados_mapeados = form_record(dados)
+
+    # Inserção atômica; depois lê só as linhas novas (inclusive de outras sessões)
+    operacoes = load_operacoes()
+    operacoes.repository.insert(dados_mapeados)
+    operacoes.refresh()
+    return operacoes.df
+
+warm()
+df = load_operacoes().df
 
 colMapa, colForm = st.columns(2)
 with colMapa:
-    tl = folium.TileLayer(
-        tiles='https://{s}.tile.openstreetmap.fr/hot/{z}/{x}/{y}.png',
-        attr='Map data © OpenStreetMap contributors',
-        name='OpenStreetMap HOT',
-        overlay=True,
-        control=True
-    )
-    m = folium.Map(tiles=tl, location=(-23.953469450472493, -46.34634017944336), zoom_start=13)
-    Draw(export=False,draw_options={'polyline': True,
-                                    'polygon': False,
-                                    'rectangle': False,
-                                    'circle': False,
-                                    'marker': True,
-                                    'circlemarker': False
-                                    }, position='bottomleft').add_to(m)
-    Geocoder(position='topleft',add_marker=True).add_to(m)
+    m = draw_map()
     output = st_folium(m, height=500, width=700)
 
 with colForm:
@@ -113,7 +65,8 @@ with colForm:
 
         linha6 = st.columns(1)
         localOp = linha6[0].text_input(label='Local',
-                                        value=str(output['last_active_drawing']), disabled=True)
+                                        value=dump_local(output['last_active_drawing'])
+                                        if output['last_active_drawing'] else '', disabled=True)
 
         respform = [nomeOp, tipoOp, concOp, 
                     respOp, cttrespOp,
@@ -127,9 +80,14 @@ with colForm:
             if not nomeOp or not respOp or not localOp:
                 st.warning("Preencha todos os campos obrigatórios!",icon='🚨')
             else:
-                df = add_dados(df, respform)
+                df = add_dados(respform)
                 st.success("Dados salvos com sucesso!")
-                st.cache_data.clear()
-                df = load_data()
 
-st.dataframe(df, hide_index=True)
\ No newline at end of file
+    proximidade = load_proximidade()
+    if proximidade is not None and localOp:
+        risco = proximidade.score_local(localOp, dt_inicio=dtIncioOp, hr_inicio=hrIncioOp,
+                                        dt_fim_prev=dtFimPrevOp, hr_fim_prev=hrFimPrevOp)
+        st.write('Acidentes a até 100 m no mesmo dia da semana e faixa de horário: ',
+                 risco['acidentes'], ' (ponderado pela gravidade: ', risco['ponderado'], ')')
+
+paged_table(df, COLUNAS, key='operacoes')
\ No newline at end of file
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from cpmu import tempo
+from cpmu.cubo import AccidentCube
+from cpmu.filtros import FilterIndex
+
+def _acidentes(n=5000, seed=3):
+    rng = np.random.default_rng(seed)
+    minutos = rng.integers(0, 10 * 365 * 24 * 60, n)
+    datas = pd.to_datetime(pd.Timestamp('2015-01-01').value + minutos * tempo.NS_MINUTO)
+    # Acidentes exatamente à meia-noite do fim do período testado
+    datas = pd.Series(datas.append(pd.to_datetime(['2018-01-01 00:00', '2018-01-01 00:00'])))
+    datas = datas.sort_values(ignore_index=True)
+    n = len(datas)
+    return pd.DataFrame({
+        'data_hora': datas,
+        'gravidade': pd.Categorical(np.where(np.arange(n) % 2, 'S/ LESÃO', 'C/ VÍTIMAS LEVES')),
+        'tipo_acidente': pd.Categorical(['COLISÃO'] * n),
+        'tempo': pd.Categorical(['BOM'] * n),
+        'logradouro': pd.Categorical(['RUA A'] * n),
+        'numero': np.ones(n),
+        'cruzamento': pd.Categorical([None] * n, categories=['RUA A']),
+        'interseccao': pd.Categorical([None] * n, categories=['RUA A x RUA A']),
+    })
+
+def test_fim_do_periodo_a_meia_noite():
+    # A data final do filtro é meia-noite: entram só os acidentes exatamente
+    # nela, como no filtro das linhas (data_hora <= fim), também pelo cubo
+    df = _acidentes()
+    index = FilterIndex(df)
+    cubo = AccidentCube(df, index)
+
+    inicio, fim = pd.Timestamp('2017-06-01'), pd.Timestamp('2018-01-01')
+    filters = [((inicio, fim), 'data_hora')]
+    datas = df['data_hora']
+    esperado = datas[(datas >= inicio) & (datas <= fim)]
+    assert (esperado == fim).sum() == 2
+
+    janela = index.window(filters)
+    np.testing.assert_array_equal(datas.iloc[janela].to_numpy(), esperado.to_numpy())
+
+    slots, contagem = cubo.slots(filters)
+    assert contagem.sum() == len(esperado)
+    np.testing.assert_array_equal(np.repeat(slots, contagem),
+                                  np.sort(esperado.dt.floor('30min').to_numpy()))
+    assert cubo.counts('gravidade', filters).sum() == len(esperado)
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from cpmu.filtros import FilterIndex, normalize_filters
+
+def test_nan_vira_uma_chave_so():
+    # O número em branco dos cruzamentos vem como um NaN novo a cada rerun
+    a = normalize_filters([([float('nan'), 10.0], 'numero'), (['RUA A'], 'logradouro')])
+    b = normalize_filters([(['RUA A'], 'logradouro'), ([10.0, float('nan')], 'numero')])
+    assert a == b and hash(a) == hash(b)
+    assert a == (('logradouro', ('RUA A',)), ('numero', (None, 10.0)))
+    assert normalize_filters([(float('nan'), 'numero')]) == (('numero', (None,)),)
+
+def test_filtro_pelo_valor_vazio():
+    df = pd.DataFrame({'numero': [10.0, np.nan, 20.0, np.nan, 10.0],
+                       'logradouro': pd.Categorical(['RUA A', None, 'RUA B', 'RUA A', None])})
+    index = FilterIndex(df, columns=['numero', 'logradouro'])
+    for vazio in (float('nan'), None):
+        assert index.select([([vazio], 'numero')]).tolist() == [1, 3]
+        assert index.select([([vazio, 10.0], 'numero')]).tolist() == [0, 1, 3, 4]
+        assert index.select([([vazio], 'logradouro')]).tolist() == [1, 4]
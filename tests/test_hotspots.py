@@ -0,0 +1,26 @@
+import pandas as pd
+
+from cpmu.hotspots import HotspotEngine
+
+def _engine():
+    df = pd.DataFrame({
+        'data_hora': pd.to_datetime(['2020-03-02 10:00', '2020-03-10 08:00', '2020-04-01 18:30']),
+        'interseccao': ['RUA A x RUA B', 'RUA A x RUA B', 'RUA C x RUA D'],
+        'gravidade': ['S/ LESÃO', 'C/ VÍTIMAS LEVES', 'S/ LESÃO'],
+    })
+    engine = HotspotEngine('interseccao')
+    engine.update(df)
+    return engine
+
+def test_periodo_fora_das_semanas_e_vazio():
+    engine = _engine()
+    assert engine.window('2010-01-01', '2011-01-01') == (0, 0)
+    assert engine.ranking('2010-01-01', '2011-01-01').empty
+    assert engine.window('2021-01-01', '2022-01-01') == (0, 0)
+    assert engine.ranking('2021-01-01', '2022-01-01').empty
+
+def test_periodo_cortado_nas_pontas():
+    engine = _engine()
+    assert engine.window('2010-01-01', '2030-01-01') == (0, engine.semanas)
+    ranking = engine.ranking('2010-01-01', '2020-03-05')
+    assert ranking['acidentes'].to_dict() == {'RUA A x RUA B': 1}
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cpmu import tempo
+
+# cpmu.tempo comparado com o código pandas que ele substituiu na página
+
+def _datas(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp('2015-01-01').value
+    minutos = rng.integers(0, 10 * 365 * 24 * 60, n)
+    datas = pd.to_datetime(inicio + minutos * tempo.NS_MINUTO)
+    # Alguns exatamente na meia-noite e no início da meia hora
+    extras = pd.to_datetime(['2018-01-01 00:00', '2018-01-01 00:30', '2020-02-29 23:30', '2024-12-31 00:00'])
+    return pd.Series(datas.append(extras)).sort_values(ignore_index=True)
+
+def _meia_hora_pandas(datas):
+    contagem = datas.dt.floor('30min').dt.time.value_counts().sort_index()
+    return contagem.index.astype(str).tolist(), contagem.to_numpy()
+
+def _semana_pandas(datas):
+    contagem = datas.groupby(datas.dt.to_period('W').dt.start_time).size()
+    return contagem.index.to_numpy(), contagem.to_numpy()
+
+def _mes_pandas(datas):
+    contagem = pd.DataFrame({'data_hora': datas}).groupby(pd.Grouper(key='data_hora', freq='ME')).size()
+    return contagem.index.to_numpy(), contagem.to_numpy()
+
+def _dia_semana_pandas(datas):
+    dias = {0: 2, 1: 3, 2: 4, 3: 5, 4: 6, 5: 7, 6: 1}
+    return datas.dt.dayofweek.map(dias).to_numpy()
+
+@pytest.fixture(params=[0, 1, 2])
+def datas(request):
+    return _datas(seed=request.param)
+
+def test_half_hour_counts(datas):
+    labels, counts = tempo.half_hour_counts(datas.to_numpy())
+    esperado_labels, esperado = _meia_hora_pandas(datas)
+    assert labels.tolist() == esperado_labels
+    np.testing.assert_array_equal(counts, esperado)
+
+def test_weekly_counts(datas):
+    semanas, counts = tempo.weekly_counts(datas.to_numpy())
+    esperado_semanas, esperado = _semana_pandas(datas)
+    np.testing.assert_array_equal(semanas, esperado_semanas)
+    np.testing.assert_array_equal(counts, esperado)
+
+def test_monthly_counts(datas):
+    meses, counts = tempo.monthly_counts(datas.to_numpy())
+    esperado_meses, esperado = _mes_pandas(datas)
+    np.testing.assert_array_equal(meses, esperado_meses)
+    np.testing.assert_array_equal(counts, esperado)
+
+def test_monthly_counts_inclui_meses_vazios():
+    datas = pd.Series(pd.to_datetime(['2019-01-15 00:00', '2019-04-02 10:00']))
+    meses, counts = tempo.monthly_counts(datas.to_numpy())
+    esperado_meses, esperado = _mes_pandas(datas)
+    np.testing.assert_array_equal(meses, esperado_meses)
+    np.testing.assert_array_equal(counts, [1, 0, 0, 1])
+    np.testing.assert_array_equal(counts, esperado)
+
+def test_dia_semana(datas):
+    np.testing.assert_array_equal(tempo.dia_semana(datas.to_numpy()), _dia_semana_pandas(datas))
+
+def test_pesos_iguais_a_linhas_repetidas(datas):
+    # Contagens das células do cubo (meia hora, quantidade) = linhas repetidas
+    slots, contagem = np.unique(datas.dt.floor('30min').to_numpy(), return_counts=True)
+    for funcao in (tempo.half_hour_counts, tempo.weekly_counts, tempo.monthly_counts):
+        rotulos, counts = funcao(slots, contagem)
+        esperado_rotulos, esperado = funcao(datas.dt.floor('30min').to_numpy())
+        np.testing.assert_array_equal(rotulos, esperado_rotulos)
+        np.testing.assert_array_equal(counts, esperado)
+
+def test_entrada_vazia():
+    vazio = pd.Series(pd.to_datetime([]), dtype='datetime64[ns]')
+    labels, counts = tempo.half_hour_counts(vazio.to_numpy())
+    assert len(labels) == 0 and len(counts) == 0
+    semanas, counts = tempo.weekly_counts(vazio.to_numpy())
+    assert len(semanas) == len(_semana_pandas(vazio)[0]) == 0 and len(counts) == 0
+    meses, counts = tempo.monthly_counts(vazio.to_numpy())
+    assert len(meses) == len(_mes_pandas(vazio)[0]) == 0 and len(counts) == 0
+    assert len(tempo.dia_semana(vazio.to_numpy())) == 0